@@ -0,0 +1,34 @@
+"""Shared, lazily-initialized backend objects for the Vercel functions.
+
+Each getter imports its backend module on first use and memoizes the result,
+so functions served from the same warm container share one initialized
+backend, and requests that never reach the backend never import it.
+"""
+
+_ask_with_rag = None
+_pdf_repository = None
+
+
+def get_rag():
+    """Get the RAG question-answering function."""
+    global _ask_with_rag
+
+    if _ask_with_rag is None:
+        from backend.logging_setup import setup_logging
+        from backend.rag import ask_with_rag, prewarm_openrouter
+        setup_logging()
+        prewarm_openrouter()
+        _ask_with_rag = ask_with_rag
+
+    return _ask_with_rag
+
+
+def get_pdf_repository():
+    """Get the PDF document repository."""
+    global _pdf_repository
+
+    if _pdf_repository is None:
+        from backend.database.repository import PDFRepository
+        _pdf_repository = PDFRepository
+
+    return _pdf_repository
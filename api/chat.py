@@ -1,58 +1,79 @@
 """Vercel serverless function for chat endpoint."""
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import sys
+from http.server import BaseHTTPRequestHandler
 import os
-from pathlib import Path
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from backend.rag import ask_with_rag
-
-app = Flask(__name__)
-
-# Enable CORS
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-CORS(app, resources={
-    r"/*": {
-        "origins": allowed_origins,
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
-
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    """Handle chat requests."""
-    try:
-        data = request.json
-        question = data.get('question', '')
-        
-        if not question:
-            return jsonify({'error': 'Question is required'}), 400
-        
-        response = ask_with_rag(question)
-        
-        return jsonify({
-            'response': response,
-            'success': True
-        })
-    
-    except Exception as e:
-        print(f"[ERROR] Exception in /api/chat: {str(e)}")
-        return jsonify({
-            'error': str(e),
-            'success': False
-        }), 500
-
-@app.route('/api/health', methods=['GET'])
-def health():
-    """Health check endpoint."""
-    return jsonify({'status': 'ok'})
-
-# Vercel requires the app to be exported
-handler = app
+import orjson
 
+from api._init import get_rag
 
+# CORS configuration, computed once per container instead of per request
+allowed_origins = frozenset(os.getenv("ALLOWED_ORIGINS", "*").split(","))
+ALLOW_ANY_ORIGIN = '*' in allowed_origins
+CORS_PREFLIGHT_HEADERS = (
+    ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, Authorization'),
+)
 
+
+class handler(BaseHTTPRequestHandler):
+    """Chat endpoint as a bare request handler (no Flask app on cold start)."""
+
+    def send_cors_headers(self):
+        """Add CORS headers for allowed origins."""
+        if ALLOW_ANY_ORIGIN:
+            self.send_header('Access-Control-Allow-Origin', '*')
+            return
+        origin = self.headers.get('Origin')
+        if origin in allowed_origins:
+            self.send_header('Access-Control-Allow-Origin', origin)
+            self.send_header('Vary', 'Origin')
+
+    def send_json(self, payload, status=200):
+        """Send a JSON response."""
+        body = orjson.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        """Handle CORS preflight."""
+        self.send_response(204)
+        self.send_cors_headers()
+        for header, value in CORS_PREFLIGHT_HEADERS:
+            self.send_header(header, value)
+        self.end_headers()
+
+    def do_GET(self):
+        """Health check endpoint."""
+        self.send_json({'status': 'ok'})
+
+    def do_POST(self):
+        """Handle chat requests."""
+        try:
+            try:
+                content_length = int(self.headers.get('Content-Length') or 0)
+                data = orjson.loads(self.rfile.read(content_length) or b'{}')
+                question = data.get('question', '')
+            except (orjson.JSONDecodeError, ValueError, AttributeError):
+                question = ''
+
+            if not question:
+                return self.send_json({'error': 'Question is required'}, 400)
+
+            # Loaded on first use so preflight and validation errors skip the RAG stack
+            ask_with_rag = get_rag()
+            response = ask_with_rag(question)
+
+            self.send_json({
+                'response': response,
+                'success': True
+            })
+
+        except Exception as e:
+            print(f"[ERROR] Exception in /api/chat: {str(e)}")
+            self.send_json({
+                'error': str(e),
+                'success': False
+            }, 500)
@@ -1,54 +1,93 @@
 """Vercel serverless function for file listing (read-only)."""
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import sys
+from flask import Flask, request, jsonify, Response
 import os
-from pathlib import Path
+import time
+import gzip
+import hashlib
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from backend.database.repository import PDFRepository
+from api._init import get_pdf_repository
+from backend.json_provider import OrjsonProvider, dumps_bytes
+from backend.cors import init_cors
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-CORS(app, resources={
-    r"/*": {
-        "origins": allowed_origins,
-        "methods": ["GET", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+init_cors(
+    app,
+    origins=allowed_origins,
+    methods=["GET", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"]
+)
+
+# Warm containers reuse the last listing for a few seconds:
+# limit -> (expires_at, etag, payload, gzip_payload)
+FILES_CACHE_TTL = 5.0
+GZIP_LEVEL = 4
+_files_cache = {}
+
+
+def _build_files_payload(limit):
+    """Query the database and serialize the file listing response body."""
+    # Loaded on first use so preflight requests skip the database stack
+    PDFRepository = get_pdf_repository()
+    
+    # Rows come back newest first (ORDER BY uploaded_at DESC in the query)
+    db_files = PDFRepository.list_all(limit=limit)
+    
+    files = []
+    for db_file in db_files:
+        files.append({
+            'id': db_file.get('id'),
+            'filename': db_file.get('filename', 'unknown'),
+            'chunks_count': db_file.get('chunks_count', 0),
+            'pages_count': db_file.get('pages_count', 0),
+            'uploaded_at': db_file.get('uploaded_at'),
+            'status': db_file.get('status', 'unknown'),
+            'file_size': db_file.get('file_size', 0),
+            'metadata': db_file.get('metadata', {}),
+            'source': db_file.get('filename', 'unknown')
+        })
+    
+    return dumps_bytes({
+        'success': True,
+        'files': files,
+        'total': len(files),
+        'note': 'PDF upload/delete disabled in Vercel deployment. Use full backend for these features.'
+    })
+
 
 @app.route('/api/files', methods=['GET'])
 def list_files():
     """List all uploaded PDF files from database (read-only)."""
     try:
-        # Get files from database only
-        db_files = PDFRepository.list_all(limit=1000)
+        limit = 1000
+        now = time.monotonic()
+        cached = _files_cache.get(limit)
         
-        files = []
-        for db_file in db_files:
-            files.append({
-                'id': db_file.get('id'),
-                'filename': db_file.get('filename', 'unknown'),
-                'chunks_count': db_file.get('chunks_count', 0),
-                'pages_count': db_file.get('pages_count', 0),
-                'uploaded_at': db_file.get('uploaded_at'),
-                'status': db_file.get('status', 'unknown'),
-                'file_size': db_file.get('file_size', 0),
-                'metadata': db_file.get('metadata', {}),
-                'source': db_file.get('filename', 'unknown')
-            })
+        if cached is None or cached[0] <= now:
+            payload = _build_files_payload(limit)
+            etag = hashlib.blake2b(payload, digest_size=8).hexdigest()
+            # Compress once per cache generation, not per request
+            cached = (now + FILES_CACHE_TTL, etag, payload, gzip.compress(payload, compresslevel=GZIP_LEVEL))
+            _files_cache[limit] = cached
         
-        files.sort(key=lambda x: x.get('uploaded_at', ''), reverse=True)
+        _, etag, payload, gzip_payload = cached
         
-        return jsonify({
-            'success': True,
-            'files': files,
-            'total': len(files),
-            'note': 'PDF upload/delete disabled in Vercel deployment. Use full backend for these features.'
-        })
+        use_gzip = request.accept_encodings['gzip'] > 0
+        if use_gzip:
+            etag = f"{etag}-gzip"
+        
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif use_gzip:
+            response = Response(gzip_payload, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(payload, mimetype='application/json')
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        return response
     
     except Exception as e:
         return jsonify({
@@ -1,18 +1,18 @@
 """Vercel serverless function - Main API router."""
 from flask import Flask, jsonify
-from flask_cors import CORS
 import os
 
+from backend.cors import init_cors
+
 app = Flask(__name__)
 
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-CORS(app, resources={
-    r"/*": {
-        "origins": allowed_origins,
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
-    }
-})
+init_cors(
+    app,
+    origins=allowed_origins,
+    methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type"]
+)
 
 @app.route('/')
 @app.route('/api')
@@ -1,34 +1,182 @@
 """Flask API server for frontend."""
-from flask import Flask, request, jsonify, Response
-from flask_cors import CORS
+from flask import Flask, Response, request, jsonify, send_file, redirect, stream_with_context
 from werkzeug.utils import secure_filename
-import sys
+from werkzeug.routing import IntegerConverter
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Data, Epilogue, Field, File, NeedData
 import os
 from pathlib import Path
 import base64
+import gzip
+import io
+import hashlib
+import shutil
+import tempfile
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from backend.rag import ask_with_rag, query_openrouter
-from backend.pdf_processor import process_uploaded_pdf
-from backend.config import CHUNK_DIR
+from backend.rag import ask_with_rag, ask_with_rag_stream, query_openrouter, read_chunk_file, clear_chunk_cache, prewarm_openrouter
+from backend.pdf_processor import process_uploaded_pdf, chunk_stats_path, write_chunk_stats
+from backend.config import CHUNK_DIR, UPLOAD_CONCURRENCY
 from backend.database.repository import PDFRepository, ChunkRepository, ChatRepository
 from backend.database.models import PDFDocument, Chunk, ChatMessage
+from backend.json_provider import OrjsonProvider
+from backend.response_cache import response_cache
+from backend.cors import init_cors
+from backend.logging_setup import setup_logging
 from datetime import datetime
 import json
+import orjson
+
+
+class FileIdConverter(IntegerConverter):
+    """
+    URL converter for document IDs.
+    
+    The default int converter also accepts non-ASCII (e.g. Arabic-Indic) digits
+    and values that overflow BIGINT; this one only matches 1-18 ASCII digits.
+    """
+    regex = r"[0-9]{1,18}"
+
+
+setup_logging()
+logger = logging.getLogger(__name__)
+prewarm_openrouter()
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.url_map.converters['file_id'] = FileIdConverter
 # Enable CORS for all routes and origins
 # Allow all origins in production, or specify your Vercel domain
-CORS(app, resources={
-    r"/api/*": {
-        "origins": "*",
-        "methods": ["GET", "POST", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+init_cors(
+    app,
+    origins=["*"],
+    methods=["GET", "POST", "DELETE", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"]
+)
 
 # Configuration for file uploads
 ALLOWED_EXTENSIONS = {'pdf'}
+ALLOWED_SUFFIXES = tuple('.' + ext for ext in ALLOWED_EXTENSIONS)  # For str.endswith
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_READ_SIZE = 64 * 1024  # Bytes read per iteration when streaming uploads to disk
+MAX_FORM_FIELD_SIZE = 64 * 1024  # Limit for non-file form fields (replace_id, replace_filename)
+SIGNED_URL_EXPIRES_IN = 3600  # Lifetime of signed PDF URLs (seconds)
+PDF_CACHE_MAX_AGE = 3600  # Browser cache lifetime for PDFs served by the API (seconds)
+MAX_REQUEST_SIZE = MAX_FILE_SIZE + 1024 * 1024  # Room for multipart headers and form fields
+FILE_TOO_LARGE_ERROR = f'File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB'
+LLM_ANALYSIS_WORKERS = 4  # Background threads for post-upload LLM analysis
+PDF_PROCESSING_WORKERS = 4  # Concurrent uploads whose PDF parsing overlaps storage/DB work
+
+# Uploads return before the LLM analysis finishes; it runs here and updates the record
+analysis_executor = ThreadPoolExecutor(max_workers=LLM_ANALYSIS_WORKERS, thread_name_prefix="llm-analysis")
+# PDF parsing runs here while the request thread uploads to storage and saves the record
+processing_executor = ThreadPoolExecutor(max_workers=PDF_PROCESSING_WORKERS, thread_name_prefix="pdf-processing")
+
+# Werkzeug stops reading bodies past this size (also covers requests without Content-Length)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    """Return oversized uploads as JSON instead of Werkzeug's HTML page."""
+    return jsonify({
+        'success': False,
+        'error': FILE_TOO_LARGE_ERROR
+    }), 413
+
+
+# Response compression for JSON payloads (file listings can be large)
+GZIP_MIN_SIZE = 1024  # Smaller bodies are not worth compressing
+GZIP_LEVEL = 4
+
+
+@app.after_request
+def gzip_json_response(response):
+    """Gzip JSON responses for clients that accept it."""
+    if (response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or request.accept_encodings['gzip'] <= 0):
+        return response
+    
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+# /api/files listing cache: the listing queries the database and the storage
+# bucket, but only changes when a PDF is uploaded, deleted or migrated
+FILES_CACHE_TTL = 30.0  # Seconds
+_files_cache = None  # (expires_at, payload)
+
+# Chunk file stats for the file system fallback, keyed on path -> (mtime, stats)
+_chunk_file_stats = {}
+
+
+@app.after_request
+def invalidate_files_cache(response):
+    """Drop the cached file listing, retrieved chunks and answers after any request that may change them."""
+    global _files_cache
+    if request.method in ('POST', 'DELETE') and request.path.startswith(('/api/upload', '/api/files')):
+        _files_cache = None
+        clear_chunk_cache()
+        # Cached answers were built from the old chunks
+        response_cache.clear()
+    return response
+
+
+def chunk_file_stats(chunk_file):
+    """
+    Count chunks and pages in a chunk file, re-reading it only when it changes.
+    
+    Counts come from the file's stats sidecar when it is up to date; otherwise
+    the JSONL is scanned and the sidecar rewritten.
+    
+    Args:
+        chunk_file: Path to a .jsonl chunk file
+        
+    Returns:
+        Dictionary with chunks_count, pages_count, source and mtime
+    """
+    mtime = chunk_file.stat().st_mtime
+    cached = _chunk_file_stats.get(chunk_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    try:
+        stats = orjson.loads(chunk_stats_path(chunk_file).read_bytes())
+        if stats.get('mtime', 0) >= mtime:
+            _chunk_file_stats[chunk_file] = (mtime, stats)
+            return stats
+    except (OSError, orjson.JSONDecodeError):
+        pass  # Missing or unreadable sidecar: scan the chunk file
+    
+    chunks = read_chunk_file(chunk_file)
+    chunks_count = len(chunks)
+    pages = {chunk_data.get('page', 0) for chunk_data in chunks}
+    
+    source = chunks[0].get('source', chunk_file.stem) if chunks else chunk_file.stem
+    try:
+        stats = write_chunk_stats(chunk_file, chunks_count, len(pages), source)
+    except OSError as e:
+        logger.warning("Could not write stats for %s: %s", chunk_file.name, e)
+        stats = {
+            'chunks_count': chunks_count,
+            'pages_count': len(pages),
+            'source': source,
+            'mtime': mtime
+        }
+    _chunk_file_stats[chunk_file] = (mtime, stats)
+    return stats
 
 
 @app.route('/api/chat', methods=['POST'])
@@ -39,12 +187,12 @@ def chat():
         question = data.get('question', '')
         
         if not question:
-            print("[ERROR] Empty question received")
+            logger.warning("Empty question received")
             return jsonify({'error': 'Question is required'}), 400
         
-        print(f"[REQUEST] Question: {question[:100]}...")
+        logger.info("Question len=%d", len(question))
         response = ask_with_rag(question)
-        print(f"[SUCCESS] Response generated ({len(response)} chars)")
+        logger.info("Response generated (%d chars)", len(response))
         
         return jsonify({
             'response': response,
@@ -52,86 +200,384 @@ def chat():
         })
     
     except Exception as e:
-        print(f"[ERROR] Exception in /api/chat: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in /api/chat: %s: %s", type(e).__name__, e)
         return jsonify({
             'error': str(e),
             'success': False
         }), 500
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat requests, streaming the response as plain text while it's generated."""
+    data = request.get_json(silent=True) or {}
+    question = data.get('question', '')
+    
+    if not question:
+        logger.warning("Empty question received")
+        return jsonify({'error': 'Question is required'}), 400
+    
+    logger.info("Streaming question len=%d", len(question))
+    
+    def generate():
+        try:
+            yield from ask_with_rag_stream(question)
+        except Exception as e:
+            # Headers are already sent, so the error can only go in the body
+            logger.exception("Exception in /api/chat/stream: %s: %s", type(e).__name__, e)
+            yield f"\n\nError: {e}"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/plain',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'response_cache': response_cache.stats()})
+
+
+def send_pdf(file_content, filename):
+    """Serve PDF bytes inline with Range, conditional request and cache support."""
+    return send_file(
+        io.BytesIO(file_content),
+        mimetype='application/pdf',
+        as_attachment=False,
+        download_name=filename,
+        conditional=True,
+        max_age=PDF_CACHE_MAX_AGE
+    )
+
+
+def create_signed_pdf_url(client, storage_path):
+    """
+    Create a signed URL for a PDF in the storage bucket.
+    
+    Args:
+        client: Supabase client with storage access
+        storage_path: Path of the PDF inside the bucket
+        
+    Returns:
+        Signed URL, or None if the response had no URL
+    """
+    signed_response = client.storage.from_("pdf").create_signed_url(
+        storage_path,
+        expires_in=SIGNED_URL_EXPIRES_IN
+    )
+    
+    if isinstance(signed_response, dict):
+        return signed_response.get('signedURL') or signed_response.get('signed_url')
+    if hasattr(signed_response, 'signedURL'):
+        return signed_response.signedURL
+    if hasattr(signed_response, 'signed_url'):
+        return signed_response.signed_url
+    return str(signed_response)
+
+
+def pdf_url_response(url, filename, url_type='signed_url'):
+    """
+    Return a storage URL for a PDF, so the browser fetches it from storage directly.
+    
+    Clients pass ?redirect=1 to get a 302 to the URL instead of JSON.
+    """
+    if request.args.get('redirect') == '1':
+        return redirect(url, code=302)
+    
+    result = {
+        'success': True,
+        'url': url,
+        'filename': filename,
+        'type': url_type
+    }
+    if url_type == 'signed_url':
+        result['expires_in'] = SIGNED_URL_EXPIRES_IN
+    return jsonify(result)
 
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+def stream_upload_to_file(dest_path):
+    """
+    Parse a multipart upload from the raw request stream, writing the "file"
+    part straight to disk while hashing it.
+    
+    Unlike request.files, the body is never spooled to a second temp file, and
+    bad filenames are rejected before the file data is read.
+    
+    Args:
+        dest_path: Path to write the uploaded file to
+        
+    Returns:
+        Tuple of (uploaded filename, form fields dict, file size, sha256 hex digest)
+        
+    Raises:
+        ValueError: If no PDF file was provided (message is user-facing)
+        RequestEntityTooLarge: If the file exceeds MAX_FILE_SIZE or a form field
+            exceeds MAX_FORM_FIELD_SIZE
+    """
+    mimetype, options = parse_options_header(request.headers.get('Content-Type', ''))
+    boundary = options.get('boundary')
+    if mimetype != 'multipart/form-data' or not boundary:
+        raise ValueError('No file provided')
+    
+    # No max_form_memory_size: Werkzeug applies it to the decoder's buffer for
+    # file parts too, and that buffer can hold a partial boundary plus a whole
+    # read block. Field sizes are checked below instead
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    stream = request.stream
+    hasher = hashlib.sha256()
+    fields = {}
+    field_data = []
+    field_size = 0
+    filename = None
+    file_size = 0
+    part = None
+    writing_file = False
+    
+    with open(dest_path, 'wb') as spool:
+        while True:
+            block = stream.read(UPLOAD_READ_SIZE)
+            decoder.receive_data(block or None)  # None marks the end of the body
+            event = decoder.next_event()
+            
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, File):
+                    part = event
+                    writing_file = event.name == 'file' and filename is None
+                    if writing_file:
+                        filename = event.filename or ''
+                        
+                        # Check if file is selected
+                        if filename == '':
+                            raise ValueError('No file selected')
+                        
+                        # Check file extension
+                        if not allowed_file(filename):
+                            raise ValueError('Invalid file type. Only PDF files are allowed.')
+                elif isinstance(event, Field):
+                    part = event
+                    writing_file = False
+                    field_data = []
+                    field_size = 0
+                elif isinstance(event, Data):
+                    if isinstance(part, Field):
+                        field_size += len(event.data)
+                        if field_size > MAX_FORM_FIELD_SIZE:
+                            raise RequestEntityTooLarge()
+                        field_data.append(event.data)
+                        if not event.more_data:
+                            fields[part.name] = b''.join(field_data).decode('utf-8', 'replace')
+                    elif writing_file:
+                        file_size += len(event.data)
+                        
+                        # Check file size
+                        if file_size > MAX_FILE_SIZE:
+                            raise RequestEntityTooLarge()
+                        
+                        hasher.update(event.data)
+                        spool.write(event.data)
+                
+                event = decoder.next_event()
+            
+            if not block or isinstance(event, Epilogue):
+                break
+    
+    # Check if file is present
+    if filename is None:
+        raise ValueError('No file provided')
+    
+    return filename, fields, file_size, hasher.hexdigest()
+
+
+def iter_chunk_models(chunks, document_id, filename, known_embeddings=None):
+    """
+    Yield Chunk models for the chunk dicts produced by the PDF processor.
+    
+    Args:
+        chunks: Chunk dicts (source, page, text)
+        document_id: ID of the PDF document the chunks belong to
+        filename: Default source for chunks without one
+        known_embeddings: Optional chunk text -> embedding map; matching chunks
+            carry that embedding, so they aren't embedded again
+    """
+    known_embeddings = known_embeddings or {}
+    for idx, chunk_data in enumerate(chunks):
+        text = chunk_data.get('text', '')
+        yield Chunk(
+            document_id=document_id,
+            source=chunk_data.get('source', filename),
+            page=chunk_data.get('page', 0),
+            text=text,
+            chunk_index=idx,
+            embedding=known_embeddings.get(text)
+        )
+
+
+def analyze_pdf_content(sample_chunks):
+    """
+    Ask the LLM for a JSON summary of a document.
+    
+    Args:
+        sample_chunks: First few chunks of the document
+        
+    Returns:
+        Parsed summary dict, {"raw_analysis": ...} if the reply wasn't JSON, or None
+    """
+    # Create prompt for OpenRouter
+    sample_text = "\n\n".join([chunk.get('text', '')[:500] for chunk in sample_chunks])
+    messages = [
+        {
+            "role": "system",
+            "content": "You are a document analysis assistant. Analyze the provided document content and return a JSON summary."
+        },
+        {
+            "role": "user",
+            "content": f"""Analyze this document excerpt and provide a JSON summary with:
+- title: Document title
+- summary: Brief summary (2-3 sentences)
+- topics: Array of main topics
+- key_points: Array of 3-5 key points
+
+Document excerpt:
+{sample_text[:2000]}
+
+Return ONLY valid JSON, no markdown formatting."""
+        }
+    ]
+    
+    llm_response = query_openrouter(messages)
+    if not llm_response:
+        return None
+    
+    # Try to extract JSON from response
+    try:
+        # Remove markdown code blocks if present
+        cleaned = llm_response.strip()
+        if cleaned.startswith('```'):
+            cleaned = cleaned.split('```')[1]
+            if cleaned.startswith('json'):
+                cleaned = cleaned[4:]
+        cleaned = cleaned.strip()
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        # If not JSON, store as text
+        return {"raw_analysis": llm_response}
+
+
+def run_llm_analysis(document_id, filename, sample_chunks):
+    """
+    Background task: analyze an uploaded PDF and merge the result into its metadata.
+    
+    Args:
+        document_id: Database ID of the PDF document
+        filename: PDF filename (metadata updates are keyed by filename)
+        sample_chunks: First few chunks of the document
+    """
+    global _files_cache
+    try:
+        llm_result = analyze_pdf_content(sample_chunks)
+        if not llm_result:
+            logger.info("[UPLOAD] No LLM analysis to update for %s", filename)
+            return
+        logger.info("[UPLOAD] LLM analysis completed for %s: %s", filename, llm_result.get('title', 'N/A'))
+        
+        # Get current metadata to preserve storage_path and public_url
+        current_doc = PDFRepository.get_by_id(document_id)
+        current_metadata = current_doc.get('metadata', {}) or {} if current_doc else {}
+        if not isinstance(current_metadata, dict):
+            current_metadata = {}
+        
+        # Merge LLM result with existing metadata
+        updated_metadata = {**current_metadata, **llm_result}
+        PDFRepository.update_metadata(filename, updated_metadata)
+        _files_cache = None
+        logger.info("[UPLOAD] Updated database record with LLM analysis")
+    except Exception as e:
+        logger.warning("LLM processing failed for %s: %s", filename, e)
 
 
 @app.route('/api/upload', methods=['POST'])
 def upload_pdf():
     """Handle PDF upload and processing."""
+    upload_dir = None
+    processing_future = None
     try:
-        # Check if file is present
-        if 'file' not in request.files:
+        # Reject oversized bodies before the multipart parser reads them
+        if request.content_length and request.content_length > MAX_REQUEST_SIZE:
             return jsonify({
                 'success': False,
-                'error': 'No file provided'
-            }), 400
+                'error': FILE_TOO_LARGE_ERROR
+            }), 413
         
-        file = request.files['file']
+        # Stream the upload to a temp file while hashing it, so the PDF is never
+        # held in memory in full
+        upload_dir = Path(tempfile.mkdtemp())
+        upload_path = upload_dir / "upload.pdf"
         
-        # Check if file is selected
-        if file.filename == '':
+        try:
+            uploaded_filename, form, file_size, content_sha256 = stream_upload_to_file(upload_path)
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'error': 'No file selected'
+                'error': str(e)
             }), 400
-        
-        # Check file extension
-        if not allowed_file(file.filename):
+        except RequestEntityTooLarge:
             return jsonify({
                 'success': False,
-                'error': 'Invalid file type. Only PDF files are allowed.'
-            }), 400
-        
-        # Read file content
-        file_content = file.read()
-        file_size = len(file_content)
-        
-        # Check file size
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({
-                'success': False,
-                'error': f'File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB'
-            }), 400
+                'error': FILE_TOO_LARGE_ERROR
+            }), 413
         
         # Check if this is a replacement upload
-        replace_id = request.form.get('replace_id')
-        replace_filename = request.form.get('replace_filename')
+        replace_id = form.get('replace_id')
+        replace_filename = form.get('replace_filename')
         
         # Secure filename
-        filename = secure_filename(file.filename)
+        filename = secure_filename(uploaded_filename)
         
         # If replacing, use the existing filename
         if replace_filename:
             filename = secure_filename(replace_filename)
-            print(f"[UPLOAD] Replacing PDF: {filename}")
+            logger.info("[UPLOAD] Replacing PDF: %s", filename)
         elif replace_id:
             # Get existing file to preserve filename
             existing_doc = PDFRepository.get_by_id(int(replace_id))
             if existing_doc:
                 filename = existing_doc.get('filename', filename)
-                print(f"[UPLOAD] Replacing PDF by ID {replace_id}: {filename}")
+                logger.info("[UPLOAD] Replacing PDF by ID %s: %s", replace_id, filename)
         
-        print(f"[UPLOAD] Processing uploaded PDF: {filename}")
+        logger.info("[UPLOAD] Processing uploaded PDF: %s", filename)
+        
+        # Skip the whole pipeline if identical content was already processed
+        if not (replace_id or replace_filename):
+            try:
+                duplicate_doc = PDFRepository.get_by_content_hash(content_sha256)
+            except Exception as e:
+                logger.warning("Duplicate check failed: %s", e)
+                duplicate_doc = None
+            
+            if duplicate_doc and duplicate_doc.get('status') == 'processed':
+                logger.info("[UPLOAD] Identical PDF already processed: %s", duplicate_doc.get('filename'))
+                return jsonify({
+                    'success': True,
+                    'duplicate': True,
+                    'filename': duplicate_doc.get('filename'),
+                    'document_id': duplicate_doc.get('id'),
+                    'chunks_created': duplicate_doc.get('chunks_count', 0),
+                    'pages_processed': duplicate_doc.get('pages_count', 0),
+                    'file_size': file_size
+                })
+        
+        # Start chunking now; it only needs the local file, so it overlaps steps 1 and 2
+        processing_future = processing_executor.submit(process_uploaded_pdf, upload_path, filename, CHUNK_DIR)
         
         # Step 1: Upload PDF file to Supabase Storage
-        print(f"[UPLOAD] Step 1: Uploading PDF file to Supabase Storage...")
+        logger.info("[UPLOAD] Step 1: Uploading PDF file to Supabase Storage...")
         storage_path = None
         
         try:
@@ -141,18 +587,19 @@ def upload_pdf():
             # Create storage path: directly in bucket root (no pdf/ folder)
             storage_path = filename
             
-            print(f"[UPLOAD] Attempting to upload to storage path: {storage_path}")
-            print(f"[UPLOAD] File size: {file_size} bytes")
+            logger.info("[UPLOAD] Attempting to upload to storage path: %s", storage_path)
+            logger.info("[UPLOAD] File size: %s bytes", file_size)
             
-            # Upload to Supabase Storage
-            storage_response = client.storage.from_("pdf").upload(
-                storage_path,
-                file_content,
-                file_options={"content-type": "application/pdf", "upsert": "true"}
-            )
+            # Upload to Supabase Storage (streamed from the temp file)
+            with open(upload_path, 'rb') as upload_file:
+                storage_response = client.storage.from_("pdf").upload(
+                    storage_path,
+                    upload_file,
+                    file_options={"content-type": "application/pdf", "upsert": "true"}
+                )
             
-            print(f"[UPLOAD] PDF uploaded to storage: {storage_path}")
-            print(f"[UPLOAD] Storage response: {storage_response}")
+            logger.info("[UPLOAD] PDF uploaded to storage: %s", storage_path)
+            logger.info("[UPLOAD] Storage response: %s", storage_response)
             
             # Try to generate signed URL (works for private buckets)
             # We'll generate signed URLs on-demand when files are accessed, not during upload
@@ -169,26 +616,25 @@ def upload_pdf():
                     public_url = signed_response.signedURL
                 else:
                     public_url = str(signed_response)
-                print(f"[UPLOAD] Generated signed URL (expires in 1 hour)")
+                logger.info("[UPLOAD] Generated signed URL (expires in 1 hour)")
             except Exception as signed_error:
                 # Fallback to public URL if bucket is public
                 try:
                     public_url = client.storage.from_("pdf").get_public_url(storage_path)
-                    print(f"[UPLOAD] Public URL: {public_url}")
+                    logger.info("[UPLOAD] Public URL: %s", public_url)
                 except Exception as url_error:
-                    print(f"[WARNING] Could not generate URL (non-critical): {url_error}")
+                    logger.warning("Could not generate URL (non-critical): %s", url_error)
                     public_url = None
             
         except Exception as storage_error:
-            print(f"[ERROR] Failed to upload to Supabase Storage: {storage_error}")
-            import traceback
-            traceback.print_exc()
-            # Continue without storage - will store in database as fallback
+            logger.exception("Failed to upload to Supabase Storage: %s", storage_error)
+            # Continue without storage - chunks are still created, but the PDF itself
+            # is not kept (blobs are never stored in the database row)
             storage_path = None
             public_url = None
         
         # Step 2: Save PDF metadata to database
-        print(f"[UPLOAD] Step 2: Saving PDF metadata to database...")
+        logger.info("[UPLOAD] Step 2: Saving PDF metadata to database...")
         
         # Check if file already exists
         existing_file = PDFRepository.get_by_filename(filename)
@@ -197,9 +643,9 @@ def upload_pdf():
         if existing_file and (replace_id or replace_filename):
             # Update existing file
             document_id = existing_file.get('id')
-            print(f"[UPLOAD] Updating existing PDF record ID: {document_id}")
+            logger.info("[UPLOAD] Updating existing PDF record ID: %s", document_id)
             
-            # Update metadata (store storage_path and public_url in metadata, keep file_content for processing)
+            # Update metadata (store storage_path, public_url and content hash in metadata)
             metadata = existing_file.get('metadata', {}) or {}
             if not isinstance(metadata, dict):
                 metadata = {}
@@ -208,6 +654,7 @@ def upload_pdf():
                 metadata["storage_path"] = storage_path
             if public_url:
                 metadata["public_url"] = public_url
+            metadata["content_sha256"] = content_sha256
             
             pdf_doc = PDFDocument(
                 id=document_id,
@@ -216,19 +663,18 @@ def upload_pdf():
                 status="processing",
                 chunks_count=existing_file.get('chunks_count', 0),
                 pages_count=existing_file.get('pages_count', 0),
-                file_content=file_content,  # Keep file_content for chunking and database storage
                 metadata=metadata if metadata else None
             )
             
             try:
                 PDFRepository.update(document_id, pdf_doc)
-                print(f"[UPLOAD] PDF updated in database with ID: {document_id}")
+                logger.info("[UPLOAD] PDF updated in database with ID: %s", document_id)
             except Exception as e:
-                print(f"[WARNING] Failed to update database: {e}")
+                logger.warning("Failed to update database: %s", e)
                 document_id = None
         else:
             # Create new file
-            metadata = {}
+            metadata = {"content_sha256": content_sha256}
             if storage_path:
                 metadata["storage_path"] = storage_path
             if public_url:
@@ -240,183 +686,131 @@ def upload_pdf():
                 status="processing",
                 chunks_count=0,
                 pages_count=0,
-                file_content=file_content,  # Keep file_content for chunking and database storage
                 metadata=metadata if metadata else None
             )
             
             try:
                 db_record = PDFRepository.create(pdf_doc)
                 document_id = db_record.get('id')
-                print(f"[UPLOAD] PDF saved to database with ID: {document_id}")
+                logger.info("[UPLOAD] PDF saved to database with ID: %s", document_id)
             except Exception as e:
-                print(f"[WARNING] Failed to save to database: {e}")
+                logger.warning("Failed to save to database: %s", e)
                 document_id = None
         
-        # Step 2: Process PDF to create chunks
-        print(f"[UPLOAD] Step 2: Processing PDF and creating chunks...")
-        result = process_uploaded_pdf(file_content, filename, CHUNK_DIR)
+        # Step 2: Process PDF to create chunks (started before step 1)
+        logger.info("[UPLOAD] Step 2: Waiting for PDF processing to finish...")
+        result = processing_future.result()
+        
+        # Chunks come back in memory (also written to CHUNK_DIR); keep them out of the response
+        chunks = result.pop('chunks', [])
         
         if not result['success']:
             if document_id:
                 PDFRepository.update_status(filename, "error")
             return jsonify(result), 500
         
-        # Step 3: Process with OpenRouter LLM to generate summary/metadata
-        print(f"[UPLOAD] Step 3: Processing with OpenRouter LLM...")
-        llm_result = None
-        try:
-            # Read first few chunks to get content summary
-            chunk_file = CHUNK_DIR / f"{filename.rsplit('.', 1)[0]}.jsonl"
-            sample_chunks = []
-            if chunk_file.exists():
-                with open(chunk_file, 'r', encoding='utf-8') as f:
-                    for i, line in enumerate(f):
-                        if i < 3 and line.strip():  # Get first 3 chunks
-                            sample_chunks.append(json.loads(line))
-            
-            if sample_chunks:
-                # Create prompt for OpenRouter
-                sample_text = "\n\n".join([chunk.get('text', '')[:500] for chunk in sample_chunks])
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "You are a document analysis assistant. Analyze the provided document content and return a JSON summary."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Analyze this document excerpt and provide a JSON summary with:
-- title: Document title
-- summary: Brief summary (2-3 sentences)
-- topics: Array of main topics
-- key_points: Array of 3-5 key points
-
-Document excerpt:
-{sample_text[:2000]}
-
-Return ONLY valid JSON, no markdown formatting."""
-                    }
-                ]
-                
-                llm_response = query_openrouter(messages)
-                if llm_response:
-                    # Try to extract JSON from response
-                    try:
-                        # Remove markdown code blocks if present
-                        cleaned = llm_response.strip()
-                        if cleaned.startswith('```'):
-                            cleaned = cleaned.split('```')[1]
-                            if cleaned.startswith('json'):
-                                cleaned = cleaned[4:]
-                        cleaned = cleaned.strip()
-                        llm_result = json.loads(cleaned)
-                        print(f"[UPLOAD] LLM analysis completed: {llm_result.get('title', 'N/A')}")
-                    except json.JSONDecodeError:
-                        # If not JSON, store as text
-                        llm_result = {"raw_analysis": llm_response}
-                        print(f"[UPLOAD] LLM analysis completed (raw text)")
-        except Exception as e:
-            print(f"[WARNING] LLM processing failed: {e}")
-            llm_result = None
+        # Step 3: Process with OpenRouter LLM to generate summary/metadata. This runs
+        # in the background and merges the result into the record's metadata, so the
+        # response doesn't wait on the LLM
+        llm_analysis = None
+        sample_chunks = chunks[:3]
+        if sample_chunks and document_id:
+            logger.info("[UPLOAD] Step 3: Queuing OpenRouter LLM analysis...")
+            analysis_executor.submit(run_llm_analysis, document_id, filename, sample_chunks)
+            llm_analysis = 'pending'
         
         # Step 4: Save chunks to database
-        print(f"[UPLOAD] Step 4: Saving chunks to database...")
+        logger.info("[UPLOAD] Step 4: Saving chunks to database...")
         chunks_saved = 0
-        if chunk_file.exists() and document_id:
+        if chunks and document_id:
             try:
-                db_chunks = []
-                with open(chunk_file, 'r', encoding='utf-8') as f:
-                    for idx, line in enumerate(f):
-                        if line.strip():
-                            chunk_data = json.loads(line)
-                            chunk = Chunk(
-                                document_id=document_id,
-                                source=chunk_data.get('source', filename),
-                                page=chunk_data.get('page', 0),
-                                text=chunk_data.get('text', ''),
-                                chunk_index=idx
-                            )
-                            db_chunks.append(chunk)
+                # A replaced PDF mostly has the same chunk texts as before; reuse
+                # their stored embeddings rather than paying for new ones
+                known_embeddings = {}
+                if existing_file:
+                    try:
+                        known_embeddings = ChunkRepository.get_embeddings_by_source(filename)
+                        logger.info("[UPLOAD] Reusing %s stored embeddings", len(known_embeddings))
+                    except Exception as e:
+                        logger.warning("Failed to load stored embeddings: %s", e)
+                
+                chunks_saved = ChunkRepository.create_batch(
+                    iter_chunk_models(chunks, document_id, filename, known_embeddings)
+                )
                 
-                if db_chunks:
-                    ChunkRepository.create_batch(db_chunks)
-                    chunks_saved = len(db_chunks)
-                    print(f"[UPLOAD] Saved {chunks_saved} chunks to database")
+                if chunks_saved:
+                    logger.info("[UPLOAD] Saved %s chunks to database", chunks_saved)
+                
+                # Replacing a PDF upserts its chunks in place; drop any extra ones
+                # the previous version had
+                if existing_file:
+                    ChunkRepository.delete_stale(filename, len(chunks))
             except Exception as e:
-                print(f"[WARNING] Failed to save chunks to database: {e}")
+                logger.warning("Failed to save chunks to database: %s", e)
         
-        # Step 5: Update PDF document with final status and LLM result
+        # Step 5: Update PDF document with final status
         if document_id:
             try:
                 PDFRepository.update_status(filename, "processed", 
                                           chunks_count=result['chunks_created'],
                                           pages_count=result['pages_processed'])
-                
-                # Update metadata with LLM result and ensure storage info is preserved
-                if llm_result:
-                    # Get current metadata to preserve storage_path and public_url
-                    current_doc = PDFRepository.get_by_id(document_id)
-                    current_metadata = current_doc.get('metadata', {}) or {} if current_doc else {}
-                    if not isinstance(current_metadata, dict):
-                        current_metadata = {}
-                    
-                    # Merge LLM result with existing metadata
-                    updated_metadata = {**current_metadata, **llm_result}
-                    PDFRepository.update_metadata(filename, updated_metadata)
-                    print(f"[UPLOAD] Updated database record with LLM analysis")
-                else:
-                    print(f"[UPLOAD] No LLM analysis to update")
             except Exception as e:
-                print(f"[WARNING] Failed to update database: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("Failed to update database: %s", e, exc_info=True)
         
         result['file_size'] = file_size
         result['document_id'] = document_id
-        result['llm_analysis'] = llm_result
+        result['llm_analysis'] = llm_analysis
         result['chunks_saved_to_db'] = chunks_saved
         result['storage_path'] = storage_path
         result['uploaded_to_storage'] = storage_path is not None
         
-        print(f"[UPLOAD] Successfully completed:")
-        print(f"  - Chunks created: {result['chunks_created']}")
-        print(f"  - Pages processed: {result['pages_processed']}")
-        print(f"  - Chunks saved to DB: {chunks_saved}")
-        print(f"  - Uploaded to storage: {storage_path is not None}")
-        print(f"  - Saved to database: {document_id is not None}")
+        logger.info("[UPLOAD] Successfully completed: %s chunks from %s pages, %s saved to DB, "
+                    "uploaded to storage: %s, saved to database: %s",
+                    result['chunks_created'], result['pages_processed'], chunks_saved,
+                    storage_path is not None, document_id is not None)
         
         return jsonify(result)
     
     except Exception as e:
-        print(f"[ERROR] Exception in /api/upload: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in /api/upload: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+    
+    finally:
+        # Don't delete the temp file while the parser may still be reading it
+        if processing_future is not None and not processing_future.cancel():
+            processing_future.exception()
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
 
 
 @app.route('/api/files', methods=['GET'])
 def list_files():
     """List all uploaded PDF files from database and Supabase Storage."""
+    global _files_cache
+    
+    cached = _files_cache
+    if cached and cached[0] > time.monotonic():
+        return jsonify(cached[1])
+    
     try:
         from backend.database.client import get_service_client
         
         # Get files from database
         try:
             db_files = PDFRepository.list_all(limit=1000)
-            print(f"[DEBUG] Found {len(db_files)} files in database")
+            logger.debug("Found %s files in database", len(db_files))
             if len(db_files) > 0:
-                print(f"[DEBUG] Sample database file: {db_files[0]}")
+                logger.debug("Sample database file: %s", db_files[0])
         except Exception as db_error:
-            print(f"[WARNING] Database query failed: {db_error}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Database query failed: %s", db_error, exc_info=True)
             db_files = []
         
-        # Create a set of filenames already in database
-        db_filenames = {db_file.get('filename') for db_file in db_files if db_file.get('filename')}
-        print(f"[DEBUG] Database filenames count: {len(db_filenames)}")
+        # Index database files by filename (storage sync looks each storage file up)
+        db_files_by_name = {db_file['filename']: db_file for db_file in db_files if db_file.get('filename')}
+        logger.debug("Database filenames count: %s", len(db_files_by_name))
         
         # Get files from Supabase Storage
         storage_files = []
@@ -432,10 +826,10 @@ def list_files():
                 storage_list = service_client.storage.from_("pdf").list()
                 if storage_list:
                     files_count = len(storage_list) if isinstance(storage_list, list) else (len(storage_list.data) if hasattr(storage_list, 'data') else 'unknown')
-                    print(f"[DEBUG] Root listing (no param) succeeded: {files_count} items")
+                    logger.debug("Root listing (no param) succeeded: %s items", files_count)
                     listing_method = "root"
             except Exception as root_error:
-                print(f"[DEBUG] Root listing (no param) failed: {root_error}")
+                logger.debug("Root listing (no param) failed: %s", root_error)
             
             # Method 2: Try listing root with empty string
             if not storage_list:
@@ -443,10 +837,10 @@ def list_files():
                     storage_list = service_client.storage.from_("pdf").list("")
                     if storage_list:
                         files_count = len(storage_list) if isinstance(storage_list, list) else (len(storage_list.data) if hasattr(storage_list, 'data') else 'unknown')
-                        print(f"[DEBUG] Root listing (empty string) succeeded: {files_count} items")
+                        logger.debug("Root listing (empty string) succeeded: %s items", files_count)
                         listing_method = "root_empty"
                 except Exception as root_error2:
-                    print(f"[DEBUG] Root listing (empty string) failed: {root_error2}")
+                    logger.debug("Root listing (empty string) failed: %s", root_error2)
             
             # Method 3: Try listing the "pdf" folder
             if not storage_list:
@@ -454,16 +848,16 @@ def list_files():
                     storage_list = service_client.storage.from_("pdf").list("pdf")
                     if storage_list:
                         files_count = len(storage_list) if isinstance(storage_list, list) else (len(storage_list.data) if hasattr(storage_list, 'data') else 'unknown')
-                        print(f"[DEBUG] 'pdf' folder listing succeeded: {files_count} items")
+                        logger.debug("'pdf' folder listing succeeded: %s items", files_count)
                         listing_method = "pdf_folder"
                 except Exception as folder_error:
-                    print(f"[DEBUG] 'pdf' folder listing failed: {folder_error}")
+                    logger.debug("'pdf' folder listing failed: %s", folder_error)
                     storage_list = None
             
             if not storage_list:
-                print(f"[WARNING] All listing methods failed - no files will be synced from storage")
+                logger.warning("All listing methods failed - no files will be synced from storage")
             
-            print(f"[DEBUG] Storage list type: {type(storage_list)}, value: {storage_list}")
+            logger.debug("Storage list type: %s, value: %s", type(storage_list), storage_list)
             
             # Handle different response formats
             files_to_process = []
@@ -481,7 +875,7 @@ def list_files():
                 if not isinstance(files_to_process, list):
                     files_to_process = []
                 
-                print(f"[DEBUG] Processing {len(files_to_process)} files from storage")
+                logger.debug("Processing %s files from storage", len(files_to_process))
                 
                 for storage_file in files_to_process:
                     # Handle both dict and object formats
@@ -500,7 +894,7 @@ def list_files():
                     
                     # Skip folders (items ending with /)
                     if raw_name and raw_name.endswith('/'):
-                        print(f"[DEBUG] Skipping folder: {raw_name}")
+                        logger.debug("Skipping folder: %s", raw_name)
                         continue
                     
                     # Extract filename from path - handle different formats:
@@ -523,10 +917,10 @@ def list_files():
                         storage_path = filename
                     else:
                         storage_path = None
-                        print(f"[WARNING] Could not extract filename from: {raw_name}")
+                        logger.warning("Could not extract filename from: %s", raw_name)
                         continue
                     
-                    print(f"[DEBUG] Processing storage file: raw_name={raw_name}, filename={filename}, storage_path={storage_path}")
+                    logger.debug("Processing storage file: raw_name=%s, filename=%s, storage_path=%s", raw_name, filename, storage_path)
                     
                     if filename:
                         # Get file metadata from storage
@@ -565,23 +959,23 @@ def list_files():
                                     public_url = str(signed_response)
                                 
                                 if public_url:
-                                    print(f"[DEBUG] Successfully got signed URL for {filename} using path: {path_attempt}")
+                                    logger.debug("Successfully got signed URL for %s using path: %s", filename, path_attempt)
                                     break  # Success, stop trying
                             except Exception as signed_error:
                                 # Fallback to public URL if bucket is public
                                 try:
                                     public_url = service_client.storage.from_("pdf").get_public_url(path_attempt)
-                                    print(f"[DEBUG] Using public URL as fallback for {filename}")
+                                    logger.debug("Using public URL as fallback for %s", filename)
                                     break
                                 except Exception as url_error:
-                                    print(f"[DEBUG] Failed to get URL with path '{path_attempt}': {url_error}")
+                                    logger.debug("Failed to get URL with path '%s': %s", path_attempt, url_error)
                                     continue
                         
                         if not public_url:
-                            print(f"[WARNING] Could not generate public URL for {filename} with any path format")
-                            print(f"[WARNING] Tried paths: {paths_to_try}")
+                            logger.warning("Could not generate public URL for %s with any path format", filename)
+                            logger.warning("Tried paths: %s", paths_to_try)
                         
-                        if filename not in db_filenames:
+                        if filename not in db_files_by_name:
                             # This file exists in storage but not in database
                             # Create a basic database record for it
                             try:
@@ -596,7 +990,7 @@ def list_files():
                                 )
                                 
                                 db_record = PDFRepository.create(pdf_doc)
-                                print(f"[SYNC] Created database record for storage file: {filename}")
+                                logger.info("[SYNC] Created database record for storage file: %s", filename)
                                 
                                 # Add to db_files list
                                 db_files.append({
@@ -610,9 +1004,7 @@ def list_files():
                                     'metadata': {"storage_path": storage_path, "public_url": public_url} if public_url else {"storage_path": storage_path}
                                 })
                             except Exception as sync_error:
-                                print(f"[WARNING] Failed to sync storage file {filename} to database: {sync_error}")
-                                import traceback
-                                traceback.print_exc()
+                                logger.warning("Failed to sync storage file %s to database: %s", filename, sync_error, exc_info=True)
                                 # Still add it to the list even if database sync fails
                                 storage_files.append({
                                     'id': None,
@@ -627,7 +1019,7 @@ def list_files():
                         else:
                             # File exists in database, but update metadata if storage_path is missing
                             # Find the matching database file and update its metadata
-                            matching_db_file = next((f for f in db_files if f.get('filename') == filename), None)
+                            matching_db_file = db_files_by_name[filename]
                             if matching_db_file:
                                 db_metadata = matching_db_file.get('metadata', {}) or {}
                                 if not isinstance(db_metadata, dict):
@@ -644,25 +1036,22 @@ def list_files():
                                 
                                 if needs_update:
                                     matching_db_file['metadata'] = db_metadata
-                                    print(f"[UPDATE] Updated metadata for {filename} with storage_path")
+                                    logger.info("[UPDATE] Updated metadata for %s with storage_path", filename)
             
-            print(f"[DEBUG] Storage sync complete: {len(storage_files)} files added to storage_files list")
-            print(f"[DEBUG] Total db_files after sync: {len(db_files)}")
+            logger.debug("Storage sync complete: %s files added to storage_files list", len(storage_files))
+            logger.debug("Total db_files after sync: %s", len(db_files))
         except Exception as storage_error:
-            print(f"[WARNING] Failed to list storage files: {storage_error}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Failed to list storage files: %s", storage_error, exc_info=True)
         
         # Process all files (from database + newly synced)
         files = []
         for db_file in db_files:
-            # Parse uploaded_at if it's a string
-            uploaded_at = db_file.get('uploaded_at')
-            if isinstance(uploaded_at, str):
-                try:
-                    uploaded_at = datetime.fromisoformat(uploaded_at.replace('Z', '+00:00'))
-                except:
-                    uploaded_at = datetime.now()
+            filename = db_file.get('filename', 'unknown')
+            
+            # Timestamps arrive as ISO-8601 strings, which already sort chronologically
+            uploaded_at = db_file.get('uploaded_at') or ''
+            if isinstance(uploaded_at, datetime):
+                uploaded_at = uploaded_at.isoformat()
             
             # Ensure metadata has public_url if storage_path exists
             metadata = db_file.get('metadata', {}) or {}
@@ -673,7 +1062,7 @@ def list_files():
             storage_path = metadata.get('storage_path')
             if storage_path and not metadata.get('public_url'):
                 public_url = None
-                filename_for_url = db_file.get('filename', 'unknown')
+                filename_for_url = filename
                 paths_to_try = [
                     storage_path,
                     filename_for_url,
@@ -681,92 +1070,77 @@ def list_files():
                 
                 for path_attempt in paths_to_try:
                     try:
-                        from backend.database.client import get_service_client
                         service_client = get_service_client()
                         public_url = service_client.storage.from_("pdf").get_public_url(path_attempt)
-                        print(f"[UPDATE] Added public_url to {filename_for_url} using path: {path_attempt}")
+                        logger.info("[UPDATE] Added public_url to %s using path: %s", filename_for_url, path_attempt)
                         break
                     except Exception as url_error:
-                        print(f"[DEBUG] Failed path '{path_attempt}' for {filename_for_url}: {url_error}")
+                        logger.debug("Failed path '%s' for %s: %s", path_attempt, filename_for_url, url_error)
                         continue
                 
                 if public_url:
                     metadata['public_url'] = public_url
                 else:
-                    print(f"[WARNING] Could not generate public_url for {filename_for_url} with any path")
+                    logger.warning("Could not generate public_url for %s with any path", filename_for_url)
             
             files.append({
                 'id': db_file.get('id'),
-                'filename': db_file.get('filename', 'unknown'),
+                'filename': filename,
                 'chunks_count': db_file.get('chunks_count', 0),
                 'pages_count': db_file.get('pages_count', 0),
-                'uploaded_at': uploaded_at.isoformat() if isinstance(uploaded_at, datetime) else str(uploaded_at),
+                'uploaded_at': uploaded_at,
                 'status': db_file.get('status', 'unknown'),
                 'file_size': db_file.get('file_size', 0),
                 'metadata': metadata,
-                'source': db_file.get('filename', 'unknown')
+                'source': filename
             })
         
         # Add storage-only files (if any failed to sync or weren't in database)
-        print(f"[DEBUG] Adding {len(storage_files)} storage-only files to response")
+        logger.debug("Adding %s storage-only files to response", len(storage_files))
         files.extend(storage_files)
         
         # Sort by upload time (newest first)
         files.sort(key=lambda x: x['uploaded_at'], reverse=True)
         
-        print(f"[DEBUG] Final count: {len(files)} files total ({len(db_files)} from DB, {len(storage_files)} from storage)")
+        logger.debug("Final count: %s files total (%s from DB, %s from storage)", len(files), len(db_files), len(storage_files))
         if len(files) == 0:
-            print("[WARNING] No files found in database or storage!")
+            logger.warning("No files found in database or storage!")
         else:
-            print(f"[DEBUG] Sample filenames: {[f.get('filename') for f in files[:5]]}")
+            logger.debug("Sample filenames: %s", [f.get('filename') for f in files[:5]])
         
-        return jsonify({
+        payload = {
             'success': True,
             'files': files,
             'total': len(files)
-        })
+        }
+        _files_cache = (time.monotonic() + FILES_CACHE_TTL, payload)
+        return jsonify(payload)
     
     except Exception as e:
         # Fallback: if everything fails, try reading from chunk files
-        print(f"[WARNING] Main query failed, falling back to file system: {e}")
+        logger.warning("Main query failed, falling back to file system: %s", e)
         try:
-            import json
             files = []
             chunk_files = list(CHUNK_DIR.glob("*.jsonl"))
             
             for chunk_file in chunk_files:
                 try:
-                    pdf_name = chunk_file.stem
-                    file_path = chunk_file
-                    
-                    chunks_count = 0
-                    pages = set()
-                    first_chunk = None
-                    
-                    with open(chunk_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if line.strip():
-                                chunks_count += 1
-                                chunk_data = json.loads(line)
-                                if first_chunk is None:
-                                    first_chunk = chunk_data
-                                pages.add(chunk_data.get('page', 0))
-                    
-                    mod_time = datetime.fromtimestamp(file_path.stat().st_mtime)
+                    stats = chunk_file_stats(chunk_file)
+                    mod_time = datetime.fromtimestamp(stats['mtime'])
                     
                     files.append({
                         'id': None,
-                        'filename': pdf_name,
-                        'chunks_count': chunks_count,
-                        'pages_count': len(pages),
+                        'filename': chunk_file.stem,
+                        'chunks_count': stats['chunks_count'],
+                        'pages_count': stats['pages_count'],
                         'uploaded_at': mod_time.isoformat(),
                         'status': 'processed',
                         'file_size': 0,
                         'metadata': {},
-                        'source': first_chunk.get('source', pdf_name) if first_chunk else pdf_name
+                        'source': stats['source']
                     })
                 except Exception as file_error:
-                    print(f"[ERROR] Failed to process file {chunk_file.name}: {file_error}")
+                    logger.error("Failed to process file %s: %s", chunk_file.name, file_error)
                     continue
             
             files.sort(key=lambda x: x['uploaded_at'], reverse=True)
@@ -777,26 +1151,24 @@ def list_files():
                 'total': len(files)
             })
         except Exception as fallback_error:
-            print(f"[ERROR] Fallback also failed: {fallback_error}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Fallback also failed: %s", fallback_error)
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 500
 
 
-@app.route('/api/files/<int:file_id>/pdf', methods=['GET'])
+@app.route('/api/files/<file_id:file_id>/pdf', methods=['GET'])
 def get_pdf_file(file_id):
     """Get PDF file URL from Supabase Storage."""
     try:
-        print(f"[REQUEST] Getting PDF file ID: {file_id}")
+        logger.info("[REQUEST] Getting PDF file ID: %s", file_id)
         
         # Get PDF document from database
         pdf_doc = PDFRepository.get_by_id(file_id)
         
         if not pdf_doc:
-            print(f"[ERROR] PDF not found: ID {file_id}")
+            logger.error("PDF not found: ID %s", file_id)
             return jsonify({
                 'success': False,
                 'error': 'PDF not found'
@@ -811,144 +1183,83 @@ def get_pdf_file(file_id):
             from backend.database.client import get_service_client
             client = get_service_client()  # Use service client for storage operations
             
-            public_url = None
             filename_for_path = pdf_doc.get('filename', 'document.pdf')
             paths_to_try = [
                 storage_path,  # Try the stored path first
                 filename_for_path,  # Try just filename
             ]
             
-            print(f"[DEBUG] Trying to get URL for file_id={file_id}, storage_path={storage_path}, filename={filename_for_path}")
-            
-            # First, try to verify file exists by listing storage
-            try:
-                storage_files = client.storage.from_("pdf").list()
-                files_list = []
-                if isinstance(storage_files, list):
-                    files_list = storage_files
-                elif hasattr(storage_files, 'data'):
-                    files_list = storage_files.data if isinstance(storage_files.data, list) else []
-                elif isinstance(storage_files, dict) and 'data' in storage_files:
-                    files_list = storage_files['data'] if isinstance(storage_files['data'], list) else []
-                
-                print(f"[DEBUG] Found {len(files_list)} files in storage")
-                # Check if our file exists
-                file_found = False
-                for sf in files_list[:10]:  # Check first 10 for debugging
-                    sf_name = sf.get('name', '') if isinstance(sf, dict) else getattr(sf, 'name', '')
-                    print(f"[DEBUG] Storage file: {sf_name}")
-                    if filename_for_path in sf_name or sf_name.endswith(filename_for_path):
-                        file_found = True
-                        print(f"[DEBUG] Found matching file: {sf_name}")
-                        break
-            except Exception as list_error:
-                print(f"[WARNING] Could not list storage files: {list_error}")
-            
             # Try to generate signed URL (works for private buckets)
-            signed_url = None
             for path_attempt in paths_to_try:
                 try:
-                    # Generate signed URL (expires in 1 hour) - works for private buckets
-                    signed_url_response = client.storage.from_("pdf").create_signed_url(
-                        path_attempt,
-                        expires_in=3600  # 1 hour expiration
-                    )
-                    
-                    if isinstance(signed_url_response, dict):
-                        signed_url = signed_url_response.get('signedURL') or signed_url_response.get('signed_url')
-                    elif hasattr(signed_url_response, 'signedURL'):
-                        signed_url = signed_url_response.signedURL
-                    elif hasattr(signed_url_response, 'signed_url'):
-                        signed_url = signed_url_response.signed_url
-                    else:
-                        signed_url = str(signed_url_response)
-                    
+                    signed_url = create_signed_pdf_url(client, path_attempt)
                     if signed_url:
-                        print(f"[SUCCESS] Generated signed URL using path: {path_attempt}")
-                        print(f"[DEBUG] Signed URL: {signed_url[:100]}...")
-                        break
+                        logger.info("[SUCCESS] Generated signed URL using path: %s", path_attempt)
+                        return pdf_url_response(signed_url, filename_for_path)
                 except Exception as signed_error:
-                    print(f"[DEBUG] Signed URL generation failed for '{path_attempt}': {signed_error}")
+                    logger.debug("Signed URL generation failed for '%s': %s", path_attempt, signed_error)
                     # Try public URL as fallback
                     try:
                         public_url = client.storage.from_("pdf").get_public_url(path_attempt)
-                        signed_url = public_url
-                        print(f"[SUCCESS] Using public URL as fallback: {path_attempt}")
-                        break
+                        logger.info("[SUCCESS] Using public URL as fallback: %s", path_attempt)
+                        return pdf_url_response(public_url, filename_for_path, 'public_url')
                     except:
                         continue
             
-            if signed_url:
-                print(f"[SUCCESS] Returning signed URL for PDF")
-                return jsonify({
-                    'success': True,
-                    'url': signed_url,
-                    'filename': filename_for_path,
-                    'type': 'signed_url'
-                })
-            
             # Fallback: Try to download and serve directly if signed URLs don't work
             if storage_path:
                 try:
-                    print(f"[INFO] Signed URL failed, downloading PDF from storage: {storage_path}")
+                    logger.info("Signed URL failed, downloading PDF from storage: %s", storage_path)
                     file_data = client.storage.from_("pdf").download(storage_path)
                     
                     if file_data:
-                        print(f"[SUCCESS] Downloaded PDF from storage: {len(file_data)} bytes")
-                        return Response(
-                            file_data,
-                            mimetype='application/pdf',
-                            headers={
-                                'Content-Disposition': f'inline; filename="{filename_for_path}"',
-                                'Content-Length': str(len(file_data))
-                            }
-                        )
+                        logger.info("[SUCCESS] Downloaded PDF from storage: %s bytes", len(file_data))
+                        return send_pdf(file_data, filename_for_path)
                 except Exception as download_error:
-                    print(f"[WARNING] Failed to download from storage: {download_error}")
+                    logger.warning("Failed to download from storage: %s", download_error)
                     # Fall through to file_content fallback
         
         # Fallback: try to get from file_content (for old files)
-        file_content_data = pdf_doc.get('file_content')
+        legacy_doc = PDFRepository.get_by_id_with_content(file_id)
+        file_content_data = legacy_doc.get('file_content') if legacy_doc else None
         
         if not file_content_data:
-            print(f"[ERROR] PDF file not found in storage or database for ID {file_id}")
+            logger.error("PDF file not found in storage or database for ID %s", file_id)
             return jsonify({
                 'success': False,
                 'error': 'PDF file not available in storage or database'
             }), 404
         
         # Debug: Check what format we got
-        print(f"[DEBUG] file_content_data type: {type(file_content_data)}")
+        logger.debug("file_content_data type: %s", type(file_content_data))
         if isinstance(file_content_data, str):
-            print(f"[DEBUG] String length: {len(file_content_data)}, first 100 chars: {file_content_data[:100]}")
+            logger.debug("String length: %s, first 100 chars: %s", len(file_content_data), file_content_data[:100])
         elif isinstance(file_content_data, bytes):
-            print(f"[DEBUG] Bytes length: {len(file_content_data)}, first 20 bytes: {file_content_data[:20]}")
+            logger.debug("Bytes length: %s, first 20 bytes: %s", len(file_content_data), file_content_data[:20])
         
         # Handle different formats: bytes, base64 string, or already decoded
         try:
             if isinstance(file_content_data, bytes):
                 # Already bytes, use directly
                 file_content = file_content_data
-                print(f"[DEBUG] Using bytes directly")
+                logger.debug("Using bytes directly")
             elif isinstance(file_content_data, str):
                 # Try to decode base64
                 try:
                     # Check if it's base64 encoded
                     file_content = base64.b64decode(file_content_data, validate=True)
-                    print(f"[DEBUG] Successfully decoded base64 string")
+                    logger.debug("Successfully decoded base64 string")
                 except Exception as decode_error:
-                    print(f"[DEBUG] Base64 decode failed: {decode_error}")
+                    logger.debug("Base64 decode failed: %s", decode_error)
                     # Try treating as raw string (shouldn't happen but let's try)
                     file_content = file_content_data.encode('latin-1')
-                    print(f"[DEBUG] Encoded string to bytes using latin-1")
+                    logger.debug("Encoded string to bytes using latin-1")
             else:
                 # Unknown type, try to convert
-                print(f"[DEBUG] Unknown type, converting to bytes")
+                logger.debug("Unknown type, converting to bytes")
                 file_content = bytes(file_content_data)
         except Exception as e:
-            print(f"[ERROR] Failed to process PDF content: {e}, type: {type(file_content_data)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to process PDF content: %s, type: %s", e, type(file_content_data))
             return jsonify({
                 'success': False,
                 'error': f'Failed to process PDF content: {str(e)}'
@@ -957,42 +1268,33 @@ def get_pdf_file(file_id):
         filename = pdf_doc.get('filename', 'document.pdf')
         
         # Verify it's a valid PDF by checking magic bytes
-        print(f"[DEBUG] Final file_content type: {type(file_content)}, length: {len(file_content)}")
-        print(f"[DEBUG] First 20 bytes (hex): {file_content[:20].hex() if len(file_content) >= 20 else 'too short'}")
-        print(f"[DEBUG] First 20 bytes (repr): {repr(file_content[:20]) if len(file_content) >= 20 else 'too short'}")
+        logger.debug("Final file_content type: %s, length: %s", type(file_content), len(file_content))
+        logger.debug("First 20 bytes (hex): %s", file_content[:20].hex() if len(file_content) >= 20 else 'too short')
+        logger.debug("First 20 bytes (repr): %s", repr(file_content[:20]) if len(file_content) >= 20 else 'too short')
         
         if len(file_content) < 4:
-            print(f"[ERROR] File content too short: {len(file_content)} bytes")
+            logger.error("File content too short: %s bytes", len(file_content))
             return jsonify({
                 'success': False,
                 'error': f'Invalid PDF file: file too short ({len(file_content)} bytes)'
             }), 400
         
         if not file_content.startswith(b'%PDF'):
-            print(f"[ERROR] File content doesn't appear to be a valid PDF")
-            print(f"[ERROR] Starts with (hex): {file_content[:50].hex()}")
-            print(f"[ERROR] Starts with (repr): {repr(file_content[:50])}")
+            logger.error("File content doesn't appear to be a valid PDF")
+            logger.error("Starts with (hex): %s", file_content[:50].hex())
+            logger.error("Starts with (repr): %s", repr(file_content[:50]))
             return jsonify({
                 'success': False,
                 'error': 'Invalid PDF file: file does not start with PDF magic bytes. File may be corrupted or incorrectly stored.'
             }), 400
         
-        print(f"[SUCCESS] Returning PDF: {filename} ({len(file_content)} bytes)")
+        logger.info("[SUCCESS] Returning PDF: %s (%s bytes)", filename, len(file_content))
         
         # Return PDF as response with proper headers
-        return Response(
-            file_content,
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'inline; filename="{filename}"',
-                'Content-Length': str(len(file_content))
-            }
-        )
+        return send_pdf(file_content, filename)
     
     except Exception as e:
-        print(f"[ERROR] Exception in /api/files/<id>/pdf: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in /api/files/<id>/pdf: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1013,53 +1315,38 @@ def get_pdf_file_by_name(filename):
         else:
             filename_without_ext = filename
         
-        print(f"[REQUEST] Getting PDF file by name: {filename} (also trying: {filename_without_ext})")
+        logger.info("[REQUEST] Getting PDF file by name: %s (also trying: %s)", filename, filename_without_ext)
         
         # Try exact match first
         pdf_doc = PDFRepository.get_by_filename(filename)
         
         # If not found, try without extension
         if not pdf_doc and filename != filename_without_ext:
-            print(f"[REQUEST] Trying filename without extension: {filename_without_ext}")
+            logger.info("[REQUEST] Trying filename without extension: %s", filename_without_ext)
             pdf_doc = PDFRepository.get_by_filename(filename_without_ext)
         
         # If still not found, try with .pdf extension
         if not pdf_doc and not filename.endswith('.pdf'):
             filename_with_ext = filename + '.pdf'
-            print(f"[REQUEST] Trying filename with extension: {filename_with_ext}")
+            logger.info("[REQUEST] Trying filename with extension: %s", filename_with_ext)
             pdf_doc = PDFRepository.get_by_filename(filename_with_ext)
         
         if not pdf_doc:
             # File not in database, try to generate signed URL from storage
-            print(f"[INFO] PDF not in database, checking storage: {filename}")
+            logger.info("PDF not in database, checking storage: %s", filename)
             try:
                 from backend.database.client import get_service_client
                 service_client = get_service_client()
                 storage_path = filename  # Files stored directly in bucket root
                 
                 # Generate signed URL (works for private buckets)
-                signed_response = service_client.storage.from_("pdf").create_signed_url(
-                    storage_path,
-                    expires_in=3600
-                )
-                
-                if isinstance(signed_response, dict):
-                    signed_url = signed_response.get('signedURL') or signed_response.get('signed_url')
-                elif hasattr(signed_response, 'signedURL'):
-                    signed_url = signed_response.signedURL
-                else:
-                    signed_url = str(signed_response)
+                signed_url = create_signed_pdf_url(service_client, storage_path)
                 
                 if signed_url:
-                    print(f"[SUCCESS] Found PDF in storage with signed URL: {storage_path}")
-                    return jsonify({
-                        'success': True,
-                        'url': signed_url,
-                        'filename': filename,
-                        'type': 'signed_url'
-                    })
+                    logger.info("[SUCCESS] Found PDF in storage with signed URL: %s", storage_path)
+                    return pdf_url_response(signed_url, filename)
             except Exception as storage_error:
-                print(f"[ERROR] PDF not found in storage: {storage_error}")
+                logger.error("PDF not found in storage: %s", storage_error)
                 return jsonify({
                     'success': False,
                     'error': f'PDF not found: "{filename}"'
@@ -1083,145 +1370,110 @@ def get_pdf_file_by_name(filename):
             
             for path_attempt in paths_to_try:
                 try:
-                    # Generate signed URL (expires in 1 hour) - works for private buckets
-                    signed_response = client.storage.from_("pdf").create_signed_url(
-                        path_attempt,
-                        expires_in=3600
-                    )
-                    
-                    if isinstance(signed_response, dict):
-                        signed_url = signed_response.get('signedURL') or signed_response.get('signed_url')
-                    elif hasattr(signed_response, 'signedURL'):
-                        signed_url = signed_response.signedURL
-                    elif hasattr(signed_response, 'signed_url'):
-                        signed_url = signed_response.signed_url
-                    else:
-                        signed_url = str(signed_response)
-                    
+                    signed_url = create_signed_pdf_url(client, path_attempt)
                     if signed_url:
-                        print(f"[SUCCESS] Generated signed URL for: {path_attempt}")
-                        return jsonify({
-                            'success': True,
-                            'url': signed_url,
-                            'filename': filename_for_path,
-                            'type': 'signed_url',
-                            'expires_in': 3600
-                        })
+                        logger.info("[SUCCESS] Generated signed URL for: %s", path_attempt)
+                        return pdf_url_response(signed_url, filename_for_path)
                 except Exception as signed_error:
                     # Fallback to public URL if bucket is public
                     try:
                         public_url = client.storage.from_("pdf").get_public_url(path_attempt)
-                        print(f"[SUCCESS] Using public URL: {path_attempt}")
-                        return jsonify({
-                            'success': True,
-                            'url': public_url,
-                            'filename': filename_for_path,
-                            'type': 'public_url'
-                        })
+                        logger.info("[SUCCESS] Using public URL: %s", path_attempt)
+                        return pdf_url_response(public_url, filename_for_path, 'public_url')
                     except:
                         continue
         
         # Fallback: try to get from file_content (for old files or if storage failed)
-        file_content_data = pdf_doc.get('file_content')
+        legacy_doc = PDFRepository.get_by_id_with_content(pdf_doc['id'])
+        file_content_data = legacy_doc.get('file_content') if legacy_doc else None
         
         if not file_content_data:
-            print(f"[ERROR] PDF file content not found for {filename}")
+            logger.error("PDF file content not found for %s", filename)
             return jsonify({
                 'success': False,
                 'error': 'PDF file content not available'
             }), 404
         
         # Debug: Check what format we got
-        print(f"[DEBUG] file_content_data type: {type(file_content_data)}")
+        logger.debug("file_content_data type: %s", type(file_content_data))
         if isinstance(file_content_data, str):
-            print(f"[DEBUG] String length: {len(file_content_data)}, first 100 chars: {file_content_data[:100]}")
+            logger.debug("String length: %s, first 100 chars: %s", len(file_content_data), file_content_data[:100])
         elif isinstance(file_content_data, bytes):
-            print(f"[DEBUG] Bytes length: {len(file_content_data)}, first 20 bytes: {file_content_data[:20]}")
+            logger.debug("Bytes length: %s, first 20 bytes: %s", len(file_content_data), file_content_data[:20])
         
         # Handle different formats: bytes, base64 string, or already decoded
         try:
             if isinstance(file_content_data, bytes):
                 # Already bytes, use directly
                 file_content = file_content_data
-                print(f"[DEBUG] Using bytes directly")
+                logger.debug("Using bytes directly")
             elif isinstance(file_content_data, str):
                 # Try to decode base64
                 try:
                     # Check if it's base64 encoded
                     file_content = base64.b64decode(file_content_data, validate=True)
-                    print(f"[DEBUG] Successfully decoded base64 string")
+                    logger.debug("Successfully decoded base64 string")
                 except Exception as decode_error:
-                    print(f"[DEBUG] Base64 decode failed: {decode_error}")
+                    logger.debug("Base64 decode failed: %s", decode_error)
                     # Try treating as raw string (shouldn't happen but let's try)
                     file_content = file_content_data.encode('latin-1')
-                    print(f"[DEBUG] Encoded string to bytes using latin-1")
+                    logger.debug("Encoded string to bytes using latin-1")
             else:
                 # Unknown type, try to convert
-                print(f"[DEBUG] Unknown type, converting to bytes")
+                logger.debug("Unknown type, converting to bytes")
                 file_content = bytes(file_content_data)
         except Exception as e:
-            print(f"[ERROR] Failed to process PDF content: {e}, type: {type(file_content_data)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to process PDF content: %s, type: %s", e, type(file_content_data))
             return jsonify({
                 'success': False,
                 'error': f'Failed to process PDF content: {str(e)}'
             }), 500
         
         # Verify it's a valid PDF by checking magic bytes
-        print(f"[DEBUG] Final file_content type: {type(file_content)}, length: {len(file_content)}")
-        print(f"[DEBUG] First 20 bytes (hex): {file_content[:20].hex() if len(file_content) >= 20 else 'too short'}")
-        print(f"[DEBUG] First 20 bytes (repr): {repr(file_content[:20]) if len(file_content) >= 20 else 'too short'}")
+        logger.debug("Final file_content type: %s, length: %s", type(file_content), len(file_content))
+        logger.debug("First 20 bytes (hex): %s", file_content[:20].hex() if len(file_content) >= 20 else 'too short')
+        logger.debug("First 20 bytes (repr): %s", repr(file_content[:20]) if len(file_content) >= 20 else 'too short')
         
         if len(file_content) < 4:
-            print(f"[ERROR] File content too short: {len(file_content)} bytes")
+            logger.error("File content too short: %s bytes", len(file_content))
             return jsonify({
                 'success': False,
                 'error': f'Invalid PDF file: file too short ({len(file_content)} bytes)'
             }), 400
         
         if not file_content.startswith(b'%PDF'):
-            print(f"[ERROR] File content doesn't appear to be a valid PDF")
-            print(f"[ERROR] Starts with (hex): {file_content[:50].hex()}")
-            print(f"[ERROR] Starts with (repr): {repr(file_content[:50])}")
+            logger.error("File content doesn't appear to be a valid PDF")
+            logger.error("Starts with (hex): %s", file_content[:50].hex())
+            logger.error("Starts with (repr): %s", repr(file_content[:50]))
             return jsonify({
                 'success': False,
                 'error': 'Invalid PDF file: file does not start with PDF magic bytes. File may be corrupted or incorrectly stored.'
             }), 400
         
-        print(f"[SUCCESS] Returning PDF: {filename} ({len(file_content)} bytes)")
+        logger.info("[SUCCESS] Returning PDF: %s (%s bytes)", filename, len(file_content))
         
         # Return PDF as response with proper headers
-        return Response(
-            file_content,
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'inline; filename="{filename}"',
-                'Content-Length': str(len(file_content))
-            }
-        )
+        return send_pdf(file_content, filename)
     
     except Exception as e:
-        print(f"[ERROR] Exception in /api/files/by-name/<filename>/pdf: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in /api/files/by-name/<filename>/pdf: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
-@app.route('/api/files/<int:file_id>', methods=['DELETE'])
+@app.route('/api/files/<file_id:file_id>', methods=['DELETE'])
 def delete_pdf_file(file_id):
     """Delete PDF file from database and storage."""
     try:
-        print(f"[DELETE] Deleting PDF file ID: {file_id}")
+        logger.info("[DELETE] Deleting PDF file ID: %s", file_id)
         
         # Get PDF document from database
         pdf_doc = PDFRepository.get_by_id(file_id)
         
         if not pdf_doc:
-            print(f"[ERROR] PDF not found: ID {file_id}")
+            logger.error("PDF not found: ID %s", file_id)
             return jsonify({
                 'success': False,
                 'error': 'PDF not found'
@@ -1243,34 +1495,34 @@ def delete_pdf_file(file_id):
                     from backend.database.client import get_service_client
                     service_client = get_service_client()  # Use service client for storage operations
                     service_client.storage.from_("pdf").remove([storage_path])
-                    print(f"[DELETE] Deleted from storage: {storage_path}")
+                    logger.info("[DELETE] Deleted from storage: %s", storage_path)
                 except Exception as storage_error:
-                    print(f"[WARNING] Failed to delete from storage: {storage_error}")
+                    logger.warning("Failed to delete from storage: %s", storage_error)
                     # Try with filename as fallback
                     try:
                         service_client.storage.from_("pdf").remove([filename])
-                        print(f"[DELETE] Deleted from storage using filename: {filename}")
+                        logger.info("[DELETE] Deleted from storage using filename: %s", filename)
                     except:
                         pass
         except Exception as e:
-            print(f"[WARNING] Storage deletion error: {e}")
+            logger.warning("Storage deletion error: %s", e)
         
         # Delete chunks associated with this PDF first
         try:
             from backend.database.client import get_service_client
             service_client = get_service_client()
             chunks_deleted = service_client.table("chunks").delete().eq("document_id", file_id).execute()
-            print(f"[DELETE] Deleted {len(chunks_deleted.data) if chunks_deleted.data else 0} chunks from database")
+            logger.info("[DELETE] Deleted %s chunks from database", len(chunks_deleted.data) if chunks_deleted.data else 0)
         except Exception as chunk_error:
-            print(f"[WARNING] Failed to delete chunks: {chunk_error}")
+            logger.warning("Failed to delete chunks: %s", chunk_error)
             # Continue with PDF deletion even if chunk deletion fails
         
         # Delete from database
         try:
             PDFRepository.delete(file_id)
-            print(f"[SUCCESS] Deleted PDF from database: {filename} (ID: {file_id})")
+            logger.info("[SUCCESS] Deleted PDF from database: %s (ID: %s)", filename, file_id)
         except Exception as db_error:
-            print(f"[ERROR] Failed to delete from database: {db_error}")
+            logger.error("Failed to delete from database: %s", db_error)
             return jsonify({
                 'success': False,
                 'error': f'Failed to delete from database: {str(db_error)}'
@@ -1282,20 +1534,62 @@ def delete_pdf_file(file_id):
         })
     
     except Exception as e:
-        print(f"[ERROR] Exception in DELETE /api/files/<id>: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in DELETE /api/files/<id>: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
+def upload_folder_pdf(client, pdf_file):
+    """
+    Upload one PDF from the local pdf folder to Supabase Storage.
+    
+    Args:
+        client: Supabase client with storage access
+        pdf_file: Path to the PDF
+        
+    Returns:
+        (status, error message) where status is 'uploaded', 'skipped' or 'failed'
+    """
+    filename = pdf_file.name
+    
+    try:
+        with open(pdf_file, 'rb') as f:
+            # Verify it's a valid PDF from the header alone
+            if f.read(4) != b'%PDF':
+                logger.info("[UPLOAD FOLDER] Skipping %s - not a valid PDF", filename)
+                return 'skipped', None
+            f.seek(0)
+            
+            # Upload to Supabase Storage - directly in bucket root (streamed from the open file)
+            storage_path = filename
+            
+            try:
+                client.storage.from_("pdf").upload(
+                    storage_path,
+                    f,
+                    file_options={"content-type": "application/pdf", "upsert": "true"}
+                )
+            except Exception as upload_error:
+                error_msg = f"Failed to upload {filename}: {str(upload_error)}"
+                logger.warning("[UPLOAD FOLDER] %s", error_msg)
+                return 'failed', error_msg
+        
+        logger.info("[UPLOAD FOLDER] Uploaded %s to storage: %s", filename, storage_path)
+        return 'uploaded', None
+    
+    except Exception as e:
+        error_msg = f"Error processing {filename}: {str(e)}"
+        logger.warning("[UPLOAD FOLDER] %s", error_msg)
+        return 'failed', error_msg
+
+
 @app.route('/api/files/upload-from-folder', methods=['POST'])
 def upload_pdfs_from_folder():
     """Upload all PDFs from the local pdf folder to Supabase Storage."""
     try:
-        print("[UPLOAD FOLDER] Starting upload of PDFs from local folder...")
+        logger.info("[UPLOAD FOLDER] Starting upload of PDFs from local folder...")
         
         from pathlib import Path
         from backend.database.client import get_service_client
@@ -1320,58 +1614,28 @@ def upload_pdfs_from_folder():
                 'error': 'No PDF files found in pdf folder'
             }), 404
         
-        print(f"[UPLOAD FOLDER] Found {len(pdf_files)} PDF files")
+        logger.info("[UPLOAD FOLDER] Found %s PDF files", len(pdf_files))
         
         uploaded_count = 0
         skipped_count = 0
         failed_count = 0
         errors = []
         
-        for pdf_file in pdf_files:
-            filename = pdf_file.name
-            
-            try:
-                # Read PDF file
-                with open(pdf_file, 'rb') as f:
-                    file_content = f.read()
-                
-                file_size = len(file_content)
-                
-                # Verify it's a valid PDF
-                if len(file_content) < 4 or not file_content.startswith(b'%PDF'):
-                    print(f"[UPLOAD FOLDER] Skipping {filename} - not a valid PDF")
-                    skipped_count += 1
-                    continue
-                
-                # Upload to Supabase Storage - directly in bucket root
-                storage_path = filename
-                
-                try:
-                    storage_response = client.storage.from_("pdf").upload(
-                        storage_path,
-                        file_content,
-                        file_options={"content-type": "application/pdf", "upsert": "true"}
-                    )
-                    
-                    print(f"[UPLOAD FOLDER] Uploaded {filename} to storage: {storage_path}")
+        # Each upload mostly waits on the network, so run several at once
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+            futures = [executor.submit(upload_folder_pdf, client, pdf_file) for pdf_file in pdf_files]
+            for future in as_completed(futures):
+                status, error_msg = future.result()
+                if status == 'uploaded':
                     uploaded_count += 1
-                    
-                except Exception as upload_error:
-                    error_msg = f"Failed to upload {filename}: {str(upload_error)}"
-                    print(f"[UPLOAD FOLDER] {error_msg}")
+                elif status == 'skipped':
+                    skipped_count += 1
+                else:
                     errors.append(error_msg)
                     failed_count += 1
-                    continue
-                    
-            except Exception as e:
-                error_msg = f"Error processing {filename}: {str(e)}"
-                print(f"[UPLOAD FOLDER] {error_msg}")
-                errors.append(error_msg)
-                failed_count += 1
-                continue
         
         result_message = f"Upload complete: {uploaded_count} uploaded, {skipped_count} skipped, {failed_count} failed"
-        print(f"[UPLOAD FOLDER] {result_message}")
+        logger.info("[UPLOAD FOLDER] %s", result_message)
         
         return jsonify({
             'success': True,
@@ -1384,9 +1648,7 @@ def upload_pdfs_from_folder():
         })
     
     except Exception as e:
-        print(f"[ERROR] Exception in upload_pdfs_from_folder: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in upload_pdfs_from_folder: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1397,7 +1659,7 @@ def upload_pdfs_from_folder():
 def migrate_pdfs_to_storage():
     """Migrate existing PDFs from database to Supabase Storage."""
     try:
-        print("[MIGRATE] Starting PDF migration to Supabase Storage...")
+        logger.info("[MIGRATE] Starting PDF migration to Supabase Storage...")
         
         from backend.database.client import get_service_client
         client = get_service_client()  # Use service client for storage operations
@@ -1416,15 +1678,16 @@ def migrate_pdfs_to_storage():
             
             # Check if already migrated
             if isinstance(metadata, dict) and metadata.get('storage_path'):
-                print(f"[MIGRATE] Skipping {filename} - already in storage")
+                logger.info("[MIGRATE] Skipping %s - already in storage", filename)
                 skipped_count += 1
                 continue
             
-            # Get file_content from database
-            file_content_data = pdf_doc.get('file_content')
+            # Get file_content from database (list_all does not select it)
+            legacy_doc = PDFRepository.get_by_id_with_content(file_id)
+            file_content_data = legacy_doc.get('file_content') if legacy_doc else None
             
             if not file_content_data:
-                print(f"[MIGRATE] Skipping {filename} - no file_content in database")
+                logger.info("[MIGRATE] Skipping %s - no file_content in database", filename)
                 skipped_count += 1
                 continue
             
@@ -1437,7 +1700,7 @@ def migrate_pdfs_to_storage():
                     try:
                         file_content = base64.b64decode(file_content_data)
                     except:
-                        print(f"[MIGRATE] Failed to decode {filename} - invalid format")
+                        logger.warning("[MIGRATE] Failed to decode %s - invalid format", filename)
                         failed_count += 1
                         continue
                 else:
@@ -1445,7 +1708,7 @@ def migrate_pdfs_to_storage():
                 
                 # Verify it's a valid PDF
                 if len(file_content) < 4 or not file_content.startswith(b'%PDF'):
-                    print(f"[MIGRATE] Skipping {filename} - not a valid PDF")
+                    logger.info("[MIGRATE] Skipping %s - not a valid PDF", filename)
                     failed_count += 1
                     continue
                 
@@ -1459,7 +1722,7 @@ def migrate_pdfs_to_storage():
                         file_options={"content-type": "application/pdf", "upsert": "true"}
                     )
                     
-                    print(f"[MIGRATE] Uploaded {filename} to storage: {storage_path}")
+                    logger.info("[MIGRATE] Uploaded %s to storage: %s", filename, storage_path)
                     
                     # Update metadata with storage_path
                     if not isinstance(metadata, dict):
@@ -1479,21 +1742,22 @@ def migrate_pdfs_to_storage():
                     )
                     
                     PDFRepository.update(file_id, pdf_doc_model)
+                    PDFRepository.clear_file_content(file_id)
                     migrated_count += 1
-                    print(f"[MIGRATE] Updated database record for {filename}")
+                    logger.info("[MIGRATE] Updated database record for %s", filename)
                     
                 except Exception as upload_error:
-                    print(f"[MIGRATE] Failed to upload {filename}: {upload_error}")
+                    logger.warning("[MIGRATE] Failed to upload %s: %s", filename, upload_error)
                     failed_count += 1
                     continue
                     
             except Exception as e:
-                print(f"[MIGRATE] Error processing {filename}: {e}")
+                logger.warning("[MIGRATE] Error processing %s: %s", filename, e)
                 failed_count += 1
                 continue
         
         result_message = f"Migration complete: {migrated_count} migrated, {skipped_count} skipped, {failed_count} failed"
-        print(f"[MIGRATE] {result_message}")
+        logger.info("[MIGRATE] %s", result_message)
         
         return jsonify({
             'success': True,
@@ -1505,9 +1769,7 @@ def migrate_pdfs_to_storage():
         })
     
     except Exception as e:
-        print(f"[ERROR] Exception in migrate_pdfs_to_storage: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in migrate_pdfs_to_storage: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1555,9 +1817,9 @@ def chat_history():
                             ChatRepository.create(chat_message)
                             saved_count = 1
                         except Exception as e:
-                            print(f"[WARNING] Failed to save message: {e}")
+                            logger.warning("Failed to save message: %s", e)
             
-            print(f"[CHAT HISTORY] Saved {saved_count} new message pairs for session {session_id}")
+            logger.info("[CHAT HISTORY] Saved %s new message pairs for session %s", saved_count, session_id)
             return jsonify({
                 'success': True,
                 'saved_count': saved_count
@@ -1583,23 +1845,15 @@ def chat_history():
                     'content': msg.get('response', '')
                 })
             
-            print(f"[CHAT HISTORY] Loaded {len(messages)} messages for session {session_id}")
+            logger.info("[CHAT HISTORY] Loaded %s messages for session %s", len(messages), session_id)
             return jsonify({
                 'success': True,
                 'messages': messages
             })
     
     except Exception as e:
-        print(f"[ERROR] Exception in /api/chat/history: {type(e).__name__}: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in /api/chat/history: %s: %s", type(e).__name__, e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
-
-
-if __name__ == '__main__':
-    print("Starting ASFC API server on http://localhost:5000")
-    app.run(debug=True, port=5000)
-
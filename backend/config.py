@@ -22,9 +22,22 @@ OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-72b-instruct:fre
 # Paths
 CHUNK_DIR = PROJECT_ROOT / "data" / "chunks"
 TOP_K = int(os.getenv("TOP_K", "3"))
+CONTEXT_MAX_CHARS = int(os.getenv("CONTEXT_MAX_CHARS", "100000"))  # Chunk text per prompt (~25k tokens at ~4 chars/token)
 
 # Embedding configuration
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "openai/text-embedding-3-small")
 EMBEDDING_DIMENSIONS = 1536
 USE_SEMANTIC_SEARCH = os.getenv("USE_SEMANTIC_SEARCH", "true").lower() == "true"
+CHUNK_BATCH_SIZE = int(os.getenv("CHUNK_BATCH_SIZE", "500"))  # Chunk rows (with embeddings) per insert request
+CHUNK_COPY_THRESHOLD = int(os.getenv("CHUNK_COPY_THRESHOLD", "100"))  # Batches this big use COPY when POSTGRES_CONNECTION_STRING is set
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))  # PDFs uploaded to storage in parallel by the folder import
 
+# Semantic response cache (answers reused for near-duplicate questions)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))  # Cosine similarity
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # Seconds
+RESPONSE_CACHE_SIZE = 1024  # Cached answers
+
+
+# Logging (hot-path progress messages are INFO, so they're skipped at the default level)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
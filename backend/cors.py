@@ -0,0 +1,38 @@
+"""Minimal CORS handling for the Flask apps (replaces flask_cors)."""
+from flask import request
+
+
+def init_cors(app, origins, methods, allow_headers):
+    """
+    Add CORS headers to every response of a Flask app.
+    
+    Flask answers OPTIONS preflight requests itself; this only decorates them
+    with the allowed methods and headers.
+    
+    Args:
+        app: Flask application
+        origins: Allowed origins ("*" allows any origin)
+        methods: Allowed methods for preflight responses
+        allow_headers: Allowed request headers for preflight responses
+    """
+    allowed_origins = frozenset(origins)
+    allow_any_origin = '*' in allowed_origins
+    preflight_headers = {
+        'Access-Control-Allow-Methods': ', '.join(methods),
+        'Access-Control-Allow-Headers': ', '.join(allow_headers),
+    }
+    
+    @app.after_request
+    def add_cors_headers(response):
+        if allow_any_origin:
+            response.headers['Access-Control-Allow-Origin'] = '*'
+        else:
+            origin = request.headers.get('Origin')
+            if origin not in allowed_origins:
+                return response
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.vary.add('Origin')
+        
+        if request.method == 'OPTIONS':
+            response.headers.update(preflight_headers)
+        return response
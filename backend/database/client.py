@@ -1,9 +1,16 @@
-"""Supabase client initialization."""
+"""Supabase client initialization.
+
+Clients are process-wide singletons: each one keeps its PostgREST/storage
+HTTP sessions (and their keep-alive connection pools), so warm servers and
+serverless containers reuse connections across requests.
+"""
+import threading
 from supabase import create_client, Client
-from backend.database.config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY
+from backend.database.config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY, POSTGRES_CONNECTION_STRING
 
 _client: Client | None = None
 _service_client: Client | None = None
+_client_lock = threading.Lock()  # Threaded servers may race on the first request
 
 
 def get_client() -> Client:
@@ -19,7 +26,9 @@ def get_client() -> Client:
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env")
         
-        _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        with _client_lock:
+            if _client is None:
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY)
     
     return _client
 
@@ -38,16 +47,35 @@ def get_service_client() -> Client:
         if not SUPABASE_URL:
             raise ValueError("SUPABASE_URL must be set in .env")
         
-        # Use service key if available, otherwise fall back to regular key
-        key = SUPABASE_SERVICE_KEY if SUPABASE_SERVICE_KEY else SUPABASE_KEY
-        if not key:
-            raise ValueError("SUPABASE_KEY or SUPABASE_SERVICE_KEY must be set in .env")
+        # Without a service key, share the anon client (and its connections)
+        if not SUPABASE_SERVICE_KEY:
+            if not SUPABASE_KEY:
+                raise ValueError("SUPABASE_KEY or SUPABASE_SERVICE_KEY must be set in .env")
+            _service_client = get_client()
+            return _service_client
         
-        _service_client = create_client(SUPABASE_URL, key)
+        with _client_lock:
+            if _service_client is None:
+                _service_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
     
     return _service_client
 
 
+def get_postgres_connection():
+    """
+    Open a direct PostgreSQL connection (bypasses PostgREST).
+    Use this for bulk operations such as COPY; the caller closes it.
+    
+    Returns:
+        psycopg2 connection
+    """
+    if not POSTGRES_CONNECTION_STRING:
+        raise ValueError("POSTGRES_CONNECTION_STRING must be set in .env")
+    
+    import psycopg2  # Only needed for direct connections
+    return psycopg2.connect(POSTGRES_CONNECTION_STRING)
+
+
 def reset_client():
     """Reset client instance (useful for testing)."""
     global _client, _service_client
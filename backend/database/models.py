@@ -14,7 +14,6 @@ class PDFDocument(BaseModel):
     file_size: Optional[int] = None
     status: str = "processed"  # processed, processing, error
     metadata: Optional[Dict[str, Any]] = None
-    file_content: Optional[bytes] = None  # TEMPORARY: PDF file content stored in database
 
 
 class ChatMessage(BaseModel):
@@ -1,10 +1,90 @@
 """Database repository for CRUD operations."""
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any
+from collections import OrderedDict
+from itertools import islice
+import csv
+import heapq
+import io
+import logging
+import re
+import threading
+import time
+import httpx
 import numpy as np
-from backend.database.client import get_client
+import orjson
+from pydantic import TypeAdapter
+from postgrest.types import ReturnMethod
+from backend.database.client import get_client, get_postgres_connection
 from backend.database.models import PDFDocument, ChatMessage, Chunk
 from backend.embeddings import generate_embedding, generate_embeddings_batch
-from backend.config import USE_SEMANTIC_SEARCH
+from backend.config import USE_SEMANTIC_SEARCH, EMBEDDING_DIMENSIONS, CHUNK_BATCH_SIZE, CHUNK_COPY_THRESHOLD
+from backend.database.config import POSTGRES_CONNECTION_STRING
+
+logger = logging.getLogger(__name__)
+
+# Column projections - avoid select("*") so the 1536-float embedding column
+# (and legacy inline PDF content) is only transferred on the paths that need it
+CHUNK_COLUMNS = "id,document_id,source,page,text,chunk_index,created_at"
+PDF_DOCUMENT_COLUMNS = "id,filename,uploaded_at,chunks_count,pages_count,status,file_size,metadata"
+CHAT_MESSAGE_COLUMNS = "id,user_id,question,response,sources,metadata,created_at"
+
+# Batch sizes for chunk ingestion
+EMBEDDING_BATCH_SIZE = 512  # Texts per /embeddings request (~250 tokens per chunk keeps us under provider token caps)
+SIMILARITY_PAGE_SIZE = 500  # Rows per page when scanning embeddings
+
+# Serializes a whole insert batch in one pydantic-core call instead of one per chunk
+_CHUNK_LIST_ADAPTER = TypeAdapter(List[Chunk])
+
+# Columns written by COPY; "" in the nullable ones is loaded as NULL (FORCE_NULL)
+CHUNK_COPY_COLUMNS = ("document_id", "source", "page", "text", "chunk_index", "embedding")
+CHUNK_COPY_SQL = (
+    f"COPY chunks_stage ({', '.join(CHUNK_COPY_COLUMNS)}) FROM STDIN "
+    "WITH (FORMAT csv, FORCE_NULL (document_id, chunk_index, embedding))"
+)
+
+# Chunks are upserted on (source, chunk_index) (idx_chunks_source_chunk_index),
+# so re-uploading a PDF overwrites its rows instead of duplicating them
+CHUNK_CONFLICT_COLUMNS = ("source", "chunk_index")
+CHUNK_STAGE_SQL = (
+    f"CREATE TEMP TABLE chunks_stage ON COMMIT DROP AS "
+    f"SELECT {', '.join(CHUNK_COPY_COLUMNS)} FROM chunks WITH NO DATA"
+)
+CHUNK_MERGE_SQL = (
+    f"INSERT INTO chunks ({', '.join(CHUNK_COPY_COLUMNS)}) "
+    f"SELECT {', '.join(CHUNK_COPY_COLUMNS)} FROM chunks_stage "
+    f"ON CONFLICT ({', '.join(CHUNK_CONFLICT_COLUMNS)}) DO UPDATE SET "
+    + ", ".join(f"{column} = EXCLUDED.{column}" for column in CHUNK_COPY_COLUMNS if column not in CHUNK_CONFLICT_COLUMNS)
+)
+
+# Query words for the text-search fallback
+WORD_RE = re.compile(r'\w+')
+
+# Insert failures that mean "batch too big": payload too large, gateway timeout,
+# Postgres statement timeout. These are retried as two half-size batches.
+OVERSIZED_BATCH_ERROR_CODES = {"413", "504", "57014"}
+
+
+def _is_oversized_batch_error(error: Exception) -> bool:
+    """Check whether an insert failed because of the batch's size rather than its content."""
+    if isinstance(error, httpx.TimeoutException):
+        return True
+    return str(getattr(error, "code", "")) in OVERSIZED_BATCH_ERROR_CODES
+
+# In-process TTL + LRU cache for PDFRepository.get_by_id (hit on every PDF view).
+# Rows exclude file_content, so an entry count bounds memory.
+PDF_CACHE_SIZE = 32
+PDF_CACHE_TTL = 300.0  # Seconds
+_pdf_cache = OrderedDict()  # document_id -> (expires_at, row)
+_pdf_cache_lock = threading.Lock()
+
+
+def _invalidate_pdf_cache(document_id: Optional[int] = None):
+    """Evict one document from the get_by_id cache, or all of them if no ID is given."""
+    with _pdf_cache_lock:
+        if document_id is None:
+            _pdf_cache.clear()
+        else:
+            _pdf_cache.pop(document_id, None)
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
@@ -19,10 +99,54 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
             return 0.0
         return float(dot_product / (norm1 * norm2))
     except Exception as e:
-        print(f"[ERROR] Cosine similarity calculation failed: {e}")
+        logger.error("Cosine similarity calculation failed: %s", e)
         return 0.0
 
 
+# Per-thread scratch space for scoring one page of embeddings, allocated once and
+# reused across queries (thread-local because Flask serves requests concurrently)
+_similarity_scratch = threading.local()
+
+
+def _similarity_buffers():
+    """Get this thread's (matrix, norms, scores) scratch buffers."""
+    if not hasattr(_similarity_scratch, 'matrix'):
+        _similarity_scratch.matrix = np.empty((SIMILARITY_PAGE_SIZE, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        _similarity_scratch.norms = np.empty(SIMILARITY_PAGE_SIZE, dtype=np.float32)
+        _similarity_scratch.scores = np.empty(SIMILARITY_PAGE_SIZE, dtype=np.float32)
+    return _similarity_scratch.matrix, _similarity_scratch.norms, _similarity_scratch.scores
+
+
+def cosine_similarity_fixed(query_unit: np.ndarray, vectors: List[List[float]]) -> np.ndarray:
+    """
+    Cosine similarity of a unit-norm query against many EMBEDDING_DIMENSIONS-wide vectors.
+    
+    The query-side work (conversion and norm) is done once by the caller, and the
+    fixed width lets the rows be stacked into one matrix for a single GEMV.
+    Up to SIMILARITY_PAGE_SIZE vectors are scored in reused scratch buffers, so the
+    returned array is only valid until the next call on the same thread.
+    """
+    if len(vectors) > SIMILARITY_PAGE_SIZE:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = np.inf  # Zero vectors score 0.0, as in cosine_similarity
+        return (matrix @ query_unit) / norms
+    
+    matrix_buf, norms_buf, scores_buf = _similarity_buffers()
+    n = len(vectors)
+    matrix, norms, scores = matrix_buf[:n], norms_buf[:n], scores_buf[:n]
+    
+    for i, vector in enumerate(vectors):
+        matrix[i] = vector
+    
+    np.matmul(matrix, query_unit, out=scores)
+    np.einsum('ij,ij->i', matrix, matrix, out=norms)
+    np.sqrt(norms, out=norms)
+    norms[norms == 0] = np.inf  # Zero vectors score 0.0, as in cosine_similarity
+    np.divide(scores, norms, out=scores)
+    return scores
+
+
 class PDFRepository:
     """Repository for PDF document operations."""
     
@@ -30,14 +154,7 @@ class PDFRepository:
     def create(document: PDFDocument) -> Dict[str, Any]:
         """Create a new PDF document record."""
         client = get_client()
-        data = document.dict(exclude_none=True)
-        
-        # TEMPORARY: Convert file_content bytes to base64 for Supabase storage
-        # Supabase/PostgreSQL BYTEA can be stored directly, but Supabase client may need base64
-        if 'file_content' in data and data['file_content'] is not None:
-            import base64
-            # Convert bytes to base64 string for JSON serialization
-            data['file_content'] = base64.b64encode(data['file_content']).decode('utf-8')
+        data = document.model_dump(exclude_none=True)
         
         result = client.table("pdf_documents").insert(data).execute()
         return result.data[0] if result.data else {}
@@ -46,12 +163,41 @@ class PDFRepository:
     def get_by_filename(filename: str) -> Optional[Dict[str, Any]]:
         """Get PDF document by filename."""
         client = get_client()
-        result = client.table("pdf_documents").select("*").eq("filename", filename).execute()
+        result = client.table("pdf_documents").select(PDF_DOCUMENT_COLUMNS).eq("filename", filename).execute()
+        return result.data[0] if result.data else None
+    
+    @staticmethod
+    def get_by_content_hash(content_sha256: str) -> Optional[Dict[str, Any]]:
+        """Get PDF document by the SHA-256 of its content (stored in metadata)."""
+        client = get_client()
+        result = client.table("pdf_documents").select(PDF_DOCUMENT_COLUMNS).eq("metadata->>content_sha256", content_sha256).limit(1).execute()
         return result.data[0] if result.data else None
     
     @staticmethod
     def get_by_id(document_id: int) -> Optional[Dict[str, Any]]:
-        """Get PDF document by ID."""
+        """Get PDF document by ID (cached for PDF_CACHE_TTL seconds)."""
+        now = time.monotonic()
+        with _pdf_cache_lock:
+            cached = _pdf_cache.get(document_id)
+            if cached and cached[0] > now:
+                _pdf_cache.move_to_end(document_id)
+                return cached[1]
+        
+        client = get_client()
+        result = client.table("pdf_documents").select(PDF_DOCUMENT_COLUMNS).eq("id", document_id).execute()
+        document = result.data[0] if result.data else None
+        
+        if document:
+            with _pdf_cache_lock:
+                _pdf_cache[document_id] = (now + PDF_CACHE_TTL, document)
+                _pdf_cache.move_to_end(document_id)
+                if len(_pdf_cache) > PDF_CACHE_SIZE:
+                    _pdf_cache.popitem(last=False)
+        return document
+    
+    @staticmethod
+    def get_by_id_with_content(document_id: int) -> Optional[Dict[str, Any]]:
+        """Get PDF document by ID including legacy inline file_content."""
         client = get_client()
         result = client.table("pdf_documents").select("*").eq("id", document_id).execute()
         return result.data[0] if result.data else None
@@ -60,7 +206,7 @@ class PDFRepository:
     def list_all(limit: int = 100) -> List[Dict[str, Any]]:
         """List all PDF documents."""
         client = get_client()
-        result = client.table("pdf_documents").select("*").order("uploaded_at", desc=True).limit(limit).execute()
+        result = client.table("pdf_documents").select(PDF_DOCUMENT_COLUMNS).order("uploaded_at", desc=True).limit(limit).execute()
         return result.data if result.data else []
     
     @staticmethod
@@ -74,35 +220,41 @@ class PDFRepository:
             update_data["pages_count"] = pages_count
         
         client.table("pdf_documents").update(update_data).eq("filename", filename).execute()
+        _invalidate_pdf_cache()  # Keyed by filename, so the cached ID is unknown
     
     @staticmethod
     def update_metadata(filename: str, metadata: Dict[str, Any]):
         """Update PDF document metadata."""
         client = get_client()
         client.table("pdf_documents").update({"metadata": metadata}).eq("filename", filename).execute()
+        _invalidate_pdf_cache()
     
     @staticmethod
     def update(document_id: int, document: PDFDocument) -> Dict[str, Any]:
         """Update an existing PDF document record."""
         client = get_client()
-        data = document.dict(exclude_none=True)
-        
-        # Convert file_content bytes to base64 for Supabase storage
-        if 'file_content' in data and data['file_content'] is not None:
-            import base64
-            data['file_content'] = base64.b64encode(data['file_content']).decode('utf-8')
+        data = document.model_dump(exclude_none=True)
         
         # Remove id from update data (it's used in the where clause)
         update_data = {k: v for k, v in data.items() if k != 'id'}
         
         result = client.table("pdf_documents").update(update_data).eq("id", document_id).execute()
+        _invalidate_pdf_cache(document_id)
         return result.data[0] if result.data else {}
     
+    @staticmethod
+    def clear_file_content(document_id: int):
+        """Drop the legacy inline file_content once the PDF lives in storage."""
+        client = get_client()
+        client.table("pdf_documents").update({"file_content": None}).eq("id", document_id).execute()
+        _invalidate_pdf_cache(document_id)
+    
     @staticmethod
     def delete(document_id: int) -> bool:
         """Delete a PDF document record."""
         client = get_client()
         result = client.table("pdf_documents").delete().eq("id", document_id).execute()
+        _invalidate_pdf_cache(document_id)
         return True
 
 
@@ -113,7 +265,7 @@ class ChunkRepository:
     def create(chunk: Chunk) -> Dict[str, Any]:
         """Create a new chunk record with embedding."""
         client = get_client()
-        data = chunk.dict(exclude_none=True)
+        data = chunk.model_dump(exclude_none=True)
         
         # Generate embedding if not already provided
         if not data.get('embedding') and chunk.text:
@@ -125,38 +277,129 @@ class ChunkRepository:
         return result.data[0] if result.data else {}
     
     @staticmethod
-    def create_batch(chunks: List[Chunk]) -> List[Dict[str, Any]]:
-        """Create multiple chunks in batch with embeddings."""
+    def create_batch(chunks: Iterable[Chunk]) -> int:
+        """
+        Create chunks with embeddings, CHUNK_BATCH_SIZE rows per request.
+        
+        Chunks are consumed lazily, so a generator keeps only one batch (and its
+        embeddings) in memory at a time.
+        
+        Args:
+            chunks: Chunks to insert (any iterable)
+        
+        Returns:
+            Number of chunks inserted
+        """
         client = get_client()
+        chunks = iter(chunks)
+        inserted = 0
+        
+        while True:
+            batch = list(islice(chunks, CHUNK_BATCH_SIZE))
+            if not batch:
+                break
+            
+            # Generate embeddings for chunks that don't have them, embedding each
+            # distinct text only once (PDFs repeat a lot of boilerplate)
+            texts_to_embed = [chunk.text for chunk in batch if not chunk.embedding and chunk.text]
+            
+            if texts_to_embed:
+                unique_texts = list(dict.fromkeys(texts_to_embed))
+                unique_embeddings = generate_embeddings_batch(unique_texts, batch_size=EMBEDDING_BATCH_SIZE)
+                embedding_map = dict(zip(unique_texts, unique_embeddings))
+                for chunk in batch:
+                    if not chunk.embedding and chunk.text:
+                        chunk.embedding = embedding_map.get(chunk.text)
+            
+            data = _CHUNK_LIST_ADAPTER.dump_python(batch, exclude_none=True)
+            
+            # Large batches go straight to Postgres with COPY when a direct connection
+            # is configured; anything else (or a failed COPY) uses the REST insert
+            if POSTGRES_CONNECTION_STRING and len(data) >= CHUNK_COPY_THRESHOLD:
+                try:
+                    inserted += ChunkRepository.copy_batch(data)
+                    continue
+                except Exception as e:
+                    logger.warning("COPY of %d chunks failed, falling back to REST insert: %s", len(data), e)
+            
+            inserted += ChunkRepository._insert_rows(client, data)
         
-        # Generate embeddings for chunks that don't have them
-        texts_to_embed = []
-        indices_to_embed = []
-        for i, chunk in enumerate(chunks):
-            if not chunk.embedding and chunk.text:
-                texts_to_embed.append(chunk.text)
-                indices_to_embed.append(i)
+        return inserted
+    
+    @staticmethod
+    def copy_batch(rows: List[Dict[str, Any]]) -> int:
+        """
+        Upsert chunk rows with a single COPY over a direct PostgreSQL connection.
         
-        # Generate embeddings in batch
-        if texts_to_embed:
-            embeddings = generate_embeddings_batch(texts_to_embed, batch_size=10)
-            for idx, embedding in zip(indices_to_embed, embeddings):
-                if embedding:
-                    chunks[idx].embedding = embedding
+        Rows are copied into a temporary staging table and merged into chunks
+        with ON CONFLICT, since COPY itself can't update existing rows.
         
-        data = [chunk.dict(exclude_none=True) for chunk in chunks]
+        Args:
+            rows: Chunk rows (as produced by model_dump)
         
-        result = client.table("chunks").insert(data).execute()
-        return result.data if result.data else []
+        Returns:
+            Number of rows upserted
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+        for row in rows:
+            embedding = row.get("embedding")
+            writer.writerow((
+                row.get("document_id"),
+                row["source"],
+                row["page"],
+                row["text"],
+                row.get("chunk_index"),
+                orjson.dumps(embedding).decode() if embedding else None  # pgvector text format
+            ))
+        buffer.seek(0)
+        
+        conn = get_postgres_connection()
+        try:
+            with conn, conn.cursor() as cursor:  # Commits on success, rolls back on error
+                cursor.execute(CHUNK_STAGE_SQL)
+                cursor.copy_expert(CHUNK_COPY_SQL, buffer)
+                cursor.execute(CHUNK_MERGE_SQL)
+        finally:
+            conn.close()
+        return len(rows)
     
     @staticmethod
-    def search_by_text(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def _insert_rows(client, rows: List[Dict[str, Any]]) -> int:
+        """
+        Upsert chunk rows in one request, splitting the batch in half if it is too big.
+        
+        Args:
+            client: Supabase client
+            rows: Chunk rows to insert
+        
+        Returns:
+            Number of rows inserted
+        """
+        try:
+            # returning=minimal: don't echo every row (and its embedding) back
+            client.table("chunks").upsert(
+                rows,
+                on_conflict=",".join(CHUNK_CONFLICT_COLUMNS),
+                returning=ReturnMethod.minimal
+            ).execute()
+            return len(rows)
+        except Exception as e:
+            if len(rows) < 2 or not _is_oversized_batch_error(e):
+                raise
+            logger.warning("Insert of %d chunks too large, retrying in halves: %s", len(rows), e)
+            half = len(rows) // 2
+            return ChunkRepository._insert_rows(client, rows[:half]) + ChunkRepository._insert_rows(client, rows[half:])
+    
+    @staticmethod
+    def search_by_text(query: str, limit: int = 10, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
         Search chunks using semantic search (preferred) or text search (fallback).
         
         Args:
             query: Search query text
             limit: Maximum number of results to return
+            query_embedding: Precomputed embedding of the query (generated if None)
         
         Returns:
             List of matching chunks ordered by relevance
@@ -165,53 +408,37 @@ class ChunkRepository:
         
         # Try semantic search first if enabled
         if USE_SEMANTIC_SEARCH:
-            query_embedding = generate_embedding(query)
+            if query_embedding is None:
+                query_embedding = generate_embedding(query)
             if query_embedding:
                 try:
-                    # Use PostgreSQL vector similarity search via Supabase RPC
-                    # Note: This requires a PostgreSQL function for cosine similarity
-                    # We'll use a workaround with raw SQL if RPC doesn't work
-                    
-                    # Try to use vector similarity search
-                    # Format: SELECT *, 1 - (embedding <=> query_embedding) as similarity
-                    # where <=> is cosine distance operator in pgvector
-                    
-                    # Convert embedding to string format for PostgreSQL
-                    embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-                    
-                    # Use Supabase's RPC or raw query for vector search
-                    # For now, we'll fetch all chunks and compute similarity in Python
-                    # (This is not ideal for large datasets, but works)
-                    
-                    # Alternative: Use Supabase PostgREST with a custom function
-                    # For production, you should create a PostgreSQL function
-                    
-                    # Fallback: Get chunks and compute similarity
-                    all_chunks_result = client.table("chunks").select("*").not_.is_("embedding", "null").limit(1000).execute()
-                    
-                    if all_chunks_result.data:
-                        chunks_with_similarity = []
-                        for chunk in all_chunks_result.data:
-                            chunk_embedding = chunk.get('embedding')
-                            if chunk_embedding:
-                                # Compute cosine similarity
-                                similarity = cosine_similarity(query_embedding, chunk_embedding)
-                                chunks_with_similarity.append((similarity, chunk))
-                        
-                        # Sort by similarity and return top results
-                        chunks_with_similarity.sort(key=lambda x: x[0], reverse=True)
-                        return [chunk for _, chunk in chunks_with_similarity[:limit]]
-                
+                    # Rank chunks in Python, paging through embeddings so memory
+                    # stays O(limit) regardless of corpus size
+                    ranked_chunks = ChunkRepository._rank_by_similarity(client, query_embedding, limit)
+                    if ranked_chunks:
+                        return ranked_chunks
                 except Exception as e:
-                    print(f"[WARNING] Semantic search failed, falling back to text search: {e}")
+                    logger.warning("Semantic search failed, falling back to text search: %s", e)
         
         # Fallback to text-based search
-        query_words = query.lower().split()
-        query_words = [w.strip() for w in query_words if len(w.strip()) > 2]  # Filter out short words
+        # Words without attached punctuation ("fuel?" -> "fuel"); short words are skipped
+        query_words = [w for w in WORD_RE.findall(query.lower()) if len(w) > 2]
+        
+        # Ranked full-text search on the GIN index (search_chunks RPC); chunks
+        # containing ANY of the words match, those containing more rank higher
+        if query_words:
+            try:
+                result = client.rpc("search_chunks", {
+                    "search_query": " or ".join(query_words),
+                    "match_count": limit
+                }).execute()
+                return result.data if result.data else []
+            except Exception as e:
+                logger.warning("Full-text search unavailable, falling back to ILIKE: %s", e)
         
         if not query_words:
             # Fallback to original method if no valid words
-            result = client.table("chunks").select("*").ilike("text", f"%{query}%").limit(limit).execute()
+            result = client.table("chunks").select(CHUNK_COLUMNS).ilike("text", f"%{query}%").limit(limit).execute()
             return result.data if result.data else []
         
         # Search for chunks containing ANY of the query words
@@ -220,7 +447,7 @@ class ChunkRepository:
         seen_ids = set()
         
         for word in query_words:
-            word_result = client.table("chunks").select("*").ilike("text", f"%{word}%").limit(limit * 2).execute()
+            word_result = client.table("chunks").select(CHUNK_COLUMNS).ilike("text", f"%{word}%").limit(limit * 2).execute()
             if word_result.data:
                 for chunk in word_result.data:
                     chunk_id = chunk.get('id')
@@ -249,60 +476,160 @@ class ChunkRepository:
             return ChunkRepository.search_by_text(query, limit)
         
         client = get_client()
+        ranked_chunks = ChunkRepository._rank_by_similarity(client, query_embedding, limit)
         
-        # Get chunks with embeddings
-        # Note: For better performance with large datasets, use PostgreSQL vector search
-        # For now, we'll fetch chunks and compute similarity
-        all_chunks_result = client.table("chunks").select("*").not_.is_("embedding", "null").limit(2000).execute()
-        
-        if not all_chunks_result.data:
+        if not ranked_chunks:
             # No chunks with embeddings, fallback to text search
             return ChunkRepository.search_by_text(query, limit)
         
-        chunks_with_similarity = []
-        for chunk in all_chunks_result.data:
-            chunk_embedding = chunk.get('embedding')
-            if chunk_embedding:
-                # Compute cosine similarity
-                similarity = cosine_similarity(query_embedding, chunk_embedding)
-                chunks_with_similarity.append((similarity, chunk))
-        
-        # Sort by similarity and return top results
-        chunks_with_similarity.sort(key=lambda x: x[0], reverse=True)
-        return [chunk for _, chunk in chunks_with_similarity[:limit]]
+        return ranked_chunks
+    
+    @staticmethod
+    def _rank_by_similarity(client, query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most similar to an embedding.
+        
+        Uses the match_chunks database function when it is installed (see
+        schema.sql). Otherwise streams (id, embedding) pairs page by page, keeps
+        a running top-k heap, then fetches the full rows for the winning IDs only.
+        
+        Returns:
+            List of chunks ordered by similarity (most similar first)
+        """
+        try:
+            result = client.rpc("match_chunks", {
+                "query_embedding": query_embedding,
+                "match_count": limit
+            }).execute()
+            if result.data:
+                return result.data
+        except Exception as e:
+            logger.warning("match_chunks RPC unavailable, ranking in Python: %s", e)
+        
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vector)
+        if query_norm == 0:
+            return []
+        query_unit = query_vector / query_norm
+        
+        heap = []
+        start = 0
+        while True:
+            page = (
+                client.table("chunks")
+                .select("id,embedding")
+                .not_.is_("embedding", "null")
+                .order("id")
+                .range(start, start + SIMILARITY_PAGE_SIZE - 1)
+                .execute()
+            )
+            rows = page.data or []
+            
+            # Split the page into fixed-width embeddings (scored as one matrix)
+            # and anything else (scored one at a time by the generic kernel)
+            fixed_ids, fixed_embeddings = [], []
+            scored = []
+            for row in rows:
+                chunk_embedding = row.get('embedding')
+                if not chunk_embedding:
+                    continue
+                # pgvector columns come back from PostgREST as "[x,y,...]" strings
+                if isinstance(chunk_embedding, str):
+                    chunk_embedding = orjson.loads(chunk_embedding)
+                if len(chunk_embedding) == EMBEDDING_DIMENSIONS:
+                    fixed_ids.append(row['id'])
+                    fixed_embeddings.append(chunk_embedding)
+                else:
+                    scored.append((cosine_similarity(query_embedding, chunk_embedding), row['id']))
+            
+            if fixed_embeddings:
+                similarities = cosine_similarity_fixed(query_unit, fixed_embeddings)
+                scored.extend(zip(similarities.tolist(), fixed_ids))
+            
+            for item in scored:
+                if len(heap) < limit:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heappushpop(heap, item)
+            
+            if len(rows) < SIMILARITY_PAGE_SIZE:
+                break
+            start += SIMILARITY_PAGE_SIZE
+        
+        top_ids = [chunk_id for _, chunk_id in sorted(heap, reverse=True)]
+        if not top_ids:
+            return []
+        
+        result = client.table("chunks").select(CHUNK_COLUMNS).in_("id", top_ids).execute()
+        chunks_by_id = {chunk['id']: chunk for chunk in (result.data or [])}
+        return [chunks_by_id[chunk_id] for chunk_id in top_ids if chunk_id in chunks_by_id]
     
     @staticmethod
     def get_by_source(source: str) -> List[Dict[str, Any]]:
         """
-        Get all chunks from a specific source PDF.
+        Get all chunks from a specific source PDF, ordered by page.
         Supports both exact match and partial match (e.g., "Bulletin-113" matches "Bulletin-113-*.pdf").
         """
         client = get_client()
         
         # First try exact match
-        result = client.table("chunks").select("*").eq("source", source).execute()
+        result = client.table("chunks").select(CHUNK_COLUMNS).eq("source", source).order("page").execute()
         if result.data:
             return result.data
         
         # If no exact match, try prefix match (for cases like "Bulletin-113" matching "Bulletin-113-*.pdf")
-        # Use ilike for case-insensitive partial matching
-        result = client.table("chunks").select("*").ilike("source", f"{source}%").execute()
-        if result.data:
-            return result.data
+        # Use ilike for case-insensitive partial matching; this also covers "<source>.pdf"
+        result = client.table("chunks").select(CHUNK_COLUMNS).ilike("source", f"{source}%").order("page").execute()
+        return result.data if result.data else []
+    
+    @staticmethod
+    def get_embeddings_by_source(source: str) -> Dict[str, List[float]]:
+        """
+        Get the stored embeddings of a source PDF's chunks, keyed by chunk text.
         
-        # Also try matching with .pdf extension
-        result = client.table("chunks").select("*").ilike("source", f"{source}.pdf").execute()
-        if result.data:
-            return result.data
+        Used when a PDF is re-uploaded, so chunks whose text didn't change
+        reuse their embedding instead of being embedded again.
         
-        return []
+        Args:
+            source: Source PDF filename (exact match)
+        
+        Returns:
+            Dictionary mapping chunk text to its embedding
+        """
+        client = get_client()
+        result = client.table("chunks").select("text,embedding").eq("source", source).not_.is_("embedding", "null").execute()
+        
+        embeddings = {}
+        for row in result.data or []:
+            embedding = row.get('embedding')
+            # PostgREST returns pgvector columns as text ("[0.1,0.2,...]")
+            if isinstance(embedding, str):
+                embedding = orjson.loads(embedding)
+            if embedding:
+                embeddings[row['text']] = embedding
+        return embeddings
     
     @staticmethod
     def get_by_document_id(document_id: int) -> List[Dict[str, Any]]:
         """Get all chunks for a specific document ID."""
         client = get_client()
-        result = client.table("chunks").select("*").eq("document_id", document_id).execute()
+        result = client.table("chunks").select(CHUNK_COLUMNS).eq("document_id", document_id).execute()
         return result.data if result.data else []
+    
+    @staticmethod
+    def delete_stale(source: str, chunks_count: int):
+        """
+        Delete chunks left over from a longer previous version of a PDF.
+        
+        Upserts overwrite chunk_index 0..chunks_count-1 in place, so only the
+        indexes past the new chunk count need removing.
+        
+        Args:
+            source: Source PDF filename
+            chunks_count: Number of chunks in the current version
+        """
+        client = get_client()
+        client.table("chunks").delete(returning=ReturnMethod.minimal).eq("source", source).gte("chunk_index", chunks_count).execute()
 
 
 class ChatRepository:
@@ -312,7 +639,7 @@ class ChatRepository:
     def create(message: ChatMessage) -> Dict[str, Any]:
         """Create a new chat message record."""
         client = get_client()
-        data = message.dict(exclude_none=True)
+        data = message.model_dump(exclude_none=True)
         
         result = client.table("chat_messages").insert(data).execute()
         return result.data[0] if result.data else {}
@@ -321,13 +648,13 @@ class ChatRepository:
     def get_by_user(user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get chat messages for a specific user."""
         client = get_client()
-        result = client.table("chat_messages").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+        result = client.table("chat_messages").select(CHAT_MESSAGE_COLUMNS).eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
         return result.data if result.data else []
     
     @staticmethod
     def get_recent(limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent chat messages."""
         client = get_client()
-        result = client.table("chat_messages").select("*").order("created_at", desc=True).limit(limit).execute()
+        result = client.table("chat_messages").select(CHAT_MESSAGE_COLUMNS).order("created_at", desc=True).limit(limit).execute()
         return result.data if result.data else []
 
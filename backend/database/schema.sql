@@ -42,12 +42,74 @@ CREATE TABLE IF NOT EXISTS chat_messages (
 -- Indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
 CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks(document_id);
-CREATE INDEX IF NOT EXISTS idx_chunks_text_search ON chunks USING gin(to_tsvector('english', text));
+-- Conflict target for chunk upserts, so re-uploading a PDF overwrites its chunks
+-- in place (remove any existing duplicate (source, chunk_index) rows first)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chunks_source_chunk_index ON chunks(source, chunk_index);
+-- Full-text tokens are computed once when a chunk is written (stored generated
+-- column), not re-derived from the text for every matching row at query time
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS text_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', text)) STORED;
+DROP INDEX IF EXISTS idx_chunks_text_search;
+CREATE INDEX IF NOT EXISTS idx_chunks_text_tsv ON chunks USING gin(text_tsv);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_user_id ON chat_messages(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_pdf_documents_filename ON pdf_documents(filename);
 CREATE INDEX IF NOT EXISTS idx_pdf_documents_status ON pdf_documents(status);
 
+-- Approximate nearest-neighbour index for match_chunks (pgvector >= 0.5.0). Built
+-- with inner-product ops to match its <#> ordering, so a query walks the HNSW
+-- graph instead of computing the distance to every chunk
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_hnsw ON chunks USING hnsw (embedding vector_ip_ops);
+
+-- Vector similarity search used by ChunkRepository.search_by_text / search_semantic
+-- Embeddings are L2-normalized before insert, so negative inner product (<#>)
+-- orders rows exactly like cosine distance without per-row norms or sqrt
+CREATE OR REPLACE FUNCTION match_chunks(query_embedding VECTOR(1536), match_count INTEGER DEFAULT 10)
+RETURNS TABLE (
+    id BIGINT,
+    document_id BIGINT,
+    source VARCHAR,
+    page INTEGER,
+    text TEXT,
+    chunk_index INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE,
+    similarity FLOAT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT c.id, c.document_id, c.source, c.page, c.text, c.chunk_index, c.created_at,
+           -(c.embedding <#> query_embedding) AS similarity
+    FROM chunks c
+    WHERE c.embedding IS NOT NULL
+    ORDER BY c.embedding <#> query_embedding
+    LIMIT match_count;
+$$;
+
+-- Full-text search used by ChunkRepository.search_by_text when semantic search is
+-- unavailable. text_tsv is indexed by idx_chunks_text_tsv, so this is a GIN
+-- index lookup instead of an ILIKE sequential scan, and ranking reuses the
+-- stored tokens.
+CREATE OR REPLACE FUNCTION search_chunks(search_query TEXT, match_count INTEGER DEFAULT 10)
+RETURNS TABLE (
+    id BIGINT,
+    document_id BIGINT,
+    source VARCHAR,
+    page INTEGER,
+    text TEXT,
+    chunk_index INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT c.id, c.document_id, c.source, c.page, c.text, c.chunk_index, c.created_at,
+           ts_rank_cd(c.text_tsv, q) AS rank
+    FROM chunks c, websearch_to_tsquery('english', search_query) q
+    WHERE c.text_tsv @@ q
+    ORDER BY rank DESC
+    LIMIT match_count;
+$$;
+
 -- Enable Row Level Security (RLS) - adjust policies as needed
 ALTER TABLE pdf_documents ENABLE ROW LEVEL SECURITY;
 ALTER TABLE chunks ENABLE ROW LEVEL SECURITY;
@@ -1,8 +1,12 @@
 """Embedding service for generating vector embeddings."""
 import os
-import requests
+import math
+import logging
 from typing import List, Optional
 from backend.config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL
+from backend.http_session import openrouter_session
+
+logger = logging.getLogger(__name__)
 
 
 # Default embedding model (OpenAI compatible)
@@ -11,6 +15,19 @@ EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "openai/text-embedding-3-small")
 EMBEDDING_DIMENSIONS = 1536
 
 
+def normalize_embedding(embedding: List[float]) -> List[float]:
+    """
+    Scale an embedding to unit L2 norm.
+    
+    Stored embeddings must be unit-norm so the database can rank by negative
+    inner product (pgvector's <#>), which then equals cosine similarity.
+    """
+    norm = math.sqrt(sum(x * x for x in embedding))
+    if norm == 0:
+        return embedding
+    return [x / norm for x in embedding]
+
+
 def generate_embedding(text: str) -> Optional[List[float]]:
     """
     Generate embedding for a single text.
@@ -25,7 +42,7 @@ def generate_embedding(text: str) -> Optional[List[float]]:
         return None
     
     if not OPENROUTER_API_KEY:
-        print("[WARNING] OPENROUTER_API_KEY not set - cannot generate embeddings")
+        logger.warning("OPENROUTER_API_KEY not set - cannot generate embeddings")
         return None
     
     url = f"{OPENROUTER_BASE_URL}/embeddings"
@@ -43,21 +60,21 @@ def generate_embedding(text: str) -> Optional[List[float]]:
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = openrouter_session.post(url, json=payload, headers=headers, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
             if 'data' in data and len(data['data']) > 0:
-                return data['data'][0]['embedding']
+                return normalize_embedding(data['data'][0]['embedding'])
             else:
-                print(f"[ERROR] Invalid embedding response structure: {data}")
+                logger.error("Invalid embedding response structure: %s", data)
                 return None
         else:
-            print(f"[ERROR] Embedding API error {response.status_code}: {response.text[:200]}")
+            logger.error("Embedding API error %s: %s", response.status_code, response.text[:200])
             return None
     
     except Exception as e:
-        print(f"[ERROR] Failed to generate embedding: {e}")
+        logger.error("Failed to generate embedding: %s", e)
         return None
 
 
@@ -73,7 +90,7 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = 10) -> List[Op
         List of embedding vectors (same order as input texts)
     """
     if not OPENROUTER_API_KEY:
-        print("[WARNING] OPENROUTER_API_KEY not set - cannot generate embeddings")
+        logger.warning("OPENROUTER_API_KEY not set - cannot generate embeddings")
         return [None] * len(texts)
     
     url = f"{OPENROUTER_BASE_URL}/embeddings"
@@ -110,7 +127,7 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = 10) -> List[Op
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=60)
+            response = openrouter_session.post(url, json=payload, headers=headers, timeout=60)
             
             if response.status_code == 200:
                 data = response.json()
@@ -120,17 +137,17 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = 10) -> List[Op
                     for j, embedding_data in enumerate(data['data']):
                         if j < len(valid_indices):
                             orig_idx = valid_indices[j] - i
-                            batch_results[orig_idx] = embedding_data['embedding']
+                            batch_results[orig_idx] = normalize_embedding(embedding_data['embedding'])
                     results.extend(batch_results)
                 else:
-                    print(f"[ERROR] Invalid batch embedding response structure")
+                    logger.error("Invalid batch embedding response structure")
                     results.extend([None] * len(batch))
             else:
-                print(f"[ERROR] Batch embedding API error {response.status_code}: {response.text[:200]}")
+                logger.error("Batch embedding API error %s: %s", response.status_code, response.text[:200])
                 results.extend([None] * len(batch))
         
         except Exception as e:
-            print(f"[ERROR] Failed to generate batch embeddings: {e}")
+            logger.error("Failed to generate batch embeddings: %s", e)
             results.extend([None] * len(batch))
     
     return results
@@ -0,0 +1,20 @@
+"""Shared HTTP session for OpenRouter requests."""
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connections kept per host; covers the chat worker threads plus the
+# upload, embedding and LLM analysis executors hitting OpenRouter at once
+HTTP_POOL_SIZE = 16
+
+
+def _create_session() -> requests.Session:
+    """Create a session whose connection pool is reused across requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Global session instance - reusing it skips the TCP/TLS handshake on every call
+openrouter_session = _create_session()
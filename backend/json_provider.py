@@ -0,0 +1,27 @@
+"""orjson-backed JSON serialization for the Flask apps."""
+import orjson
+from flask.json.provider import JSONProvider
+
+# Non-str dict keys are allowed to match the stdlib encoder; anything orjson
+# cannot serialize natively (e.g. Decimal) falls back to str()
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps_bytes(obj) -> bytes:
+    """Serialize an object to JSON bytes."""
+    return orjson.dumps(obj, default=str, option=ORJSON_OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider that encodes with orjson (C, native datetime support)."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype="application/json")
@@ -0,0 +1,37 @@
+"""Logging configuration for the backend.
+
+Records are handed to a queue by the request threads; a single listener thread
+formats them and writes to stderr, so request threads never block on output.
+"""
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from backend.config import LOG_LEVEL
+
+LOG_FORMAT = "[%(levelname)s] %(name)s: %(message)s"
+
+_listener = None
+
+
+def setup_logging():
+    """Attach a queue-backed handler to the "backend" logger (safe to call repeatedly)."""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    logger = logging.getLogger("backend")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush queued records on shutdown
@@ -1,10 +1,51 @@
 """PDF processing module - extracts text and creates chunks."""
-import json
+import orjson
 import re
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Union, BinaryIO
 import fitz  # PyMuPDF
 
+# Sidecar written next to each chunk file with its precomputed counts, so file
+# listings don't have to re-parse the JSONL
+STATS_SUFFIX = ".meta.json"
+
+
+def chunk_stats_path(chunk_file: Path) -> Path:
+    """Get the stats sidecar path for a .jsonl chunk file."""
+    return chunk_file.with_name(chunk_file.stem + STATS_SUFFIX)
+
+
+def write_chunk_stats(chunk_file: Path, chunks_count: int, pages_count: int, source: str) -> Dict:
+    """
+    Write the stats sidecar for a chunk file.
+    
+    Args:
+        chunk_file: Path to the .jsonl chunk file (must already be written)
+        chunks_count: Number of chunks in the file
+        pages_count: Number of distinct pages the chunks come from
+        source: Source PDF filename
+    
+    Returns:
+        The stats dictionary (mtime is the chunk file's mtime it describes)
+    """
+    stats = {
+        "chunks_count": chunks_count,
+        "pages_count": pages_count,
+        "source": source,
+        "mtime": chunk_file.stat().st_mtime
+    }
+    chunk_stats_path(chunk_file).write_bytes(orjson.dumps(stats))
+    return stats
+
+
+# Text cleaning patterns, compiled once
+WHITESPACE_RE = re.compile(r'\s+')
+# Page numbers and headers/footers: "Page 1 of 10" and "1/10" style
+PAGE_NUMBER_RE = re.compile(r'Page \d+ of \d+|\d+\s*/\s*\d+', re.IGNORECASE)
+
+# Preferred chunk break points, in priority order
+SENTENCE_ENDINGS = ('. ', '.\n', '! ', '!\n', '? ', '?\n')
+
 
 def clean_text(text: str) -> str:
     """
@@ -20,11 +61,10 @@ def clean_text(text: str) -> str:
         return ""
     
     # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_RE.sub(' ', text)
     
     # Remove page numbers and headers/footers (common patterns)
-    text = re.sub(r'Page \d+ of \d+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\d+\s*/\s*\d+', '', text)  # Remove "1/10" style page numbers
+    text = PAGE_NUMBER_RE.sub('', text)
     
     # Normalize unicode
     text = text.replace('\u2019', "'")  # Right single quotation mark
@@ -53,15 +93,17 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[st
     
     chunks = []
     start = 0
+    text_length = len(text)
     
-    while start < len(text):
+    while start < text_length:
         end = start + chunk_size
         
         # Try to break at sentence boundary
-        if end < len(text):
-            # Look for sentence endings
-            for punct in ['. ', '.\n', '! ', '!\n', '? ', '?\n']:
-                last_punct = text.rfind(punct, start, end)
+        if end < text_length:
+            # Look for sentence endings past the overlap, so the next chunk
+            # always starts further on (an earlier break would loop forever)
+            for punct in SENTENCE_ENDINGS:
+                last_punct = text.rfind(punct, start + overlap, end)
                 if last_punct != -1:
                     end = last_punct + len(punct)
                     break
@@ -70,130 +112,129 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[st
         if chunk:
             chunks.append(chunk)
         
+        # Stop once the end of the text is reached; another pass would only
+        # emit the overlap, which this chunk already contains
+        if end >= text_length:
+            break
+        
         # Move start forward with overlap
         start = end - overlap
-        if start >= len(text):
-            break
     
     return chunks
 
 
-def process_pdf(pdf_path: Path, output_dir: Path) -> Dict:
+def process_pdf(pdf: Union[Path, bytes], output_dir: Path, filename: Optional[str] = None) -> Dict:
     """
     Process a PDF file and create JSONL chunks.
     
     Args:
-        pdf_path: Path to PDF file
+        pdf: Path to PDF file, or the PDF content already in memory
         output_dir: Directory to save JSONL chunks
+        filename: Name used as the chunk source and for the JSONL file
+            (defaults to the path's name; required for in-memory content)
     
     Returns:
-        Dictionary with processing results
+        Dictionary with processing results; "chunks" holds the chunk dicts
+        written to the JSONL file, so callers don't have to re-read it
     """
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Get PDF filename without extension
-    pdf_name = pdf_path.stem
+    source = filename or pdf.name
+    pdf_name = Path(source).stem
     output_file = output_dir / f"{pdf_name}.jsonl"
     
-    chunks_created = 0
+    chunks = []
     pages_processed = 0
     
     try:
-        # Open PDF
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
+        # Phase 1: extract every page's text, closing the PDF as soon as that's done
+        if isinstance(pdf, Path):
+            doc = fitz.open(pdf)
+        else:
+            doc = fitz.open(stream=pdf, filetype="pdf")
+        with doc:
+            total_pages = len(doc)
+            print(f"[PDF] Processing {pdf_name}: {total_pages} pages")
+            page_texts = [page.get_text() for page in doc]
         
-        print(f"[PDF] Processing {pdf_name}: {total_pages} pages")
-        
-        # Process each page
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            
-            # Extract text
-            text = page.get_text()
-            
-            if not text or len(text.strip()) < 50:  # Skip pages with too little text
+        # Phase 2: clean and chunk each page
+        for page_num, text in enumerate(page_texts, start=1):
+            # Skip pages with too little text; the raw length check rules out
+            # most blank pages without building a stripped copy
+            if len(text) < 50 or len(text.strip()) < 50:
                 continue
             
-            # Clean text
             cleaned_text = clean_text(text)
-            
             if not cleaned_text:
                 continue
             
-            # Create chunks from page
-            page_chunks = chunk_text(cleaned_text, chunk_size=1000, overlap=200)
-            
-            # Write chunks to JSONL
-            with open(output_file, 'a', encoding='utf-8') as f:
-                for chunk_content in page_chunks:
-                    chunk_data = {
-                        "source": pdf_path.name,
-                        "page": page_num + 1,
-                        "text": chunk_content
-                    }
-                    f.write(json.dumps(chunk_data, ensure_ascii=False) + '\n')
-                    chunks_created += 1
-            
+            chunks.extend(
+                {"source": source, "page": page_num, "text": chunk_content}
+                for chunk_content in chunk_text(cleaned_text, chunk_size=1000, overlap=200)
+            )
             pages_processed += 1
         
-        doc.close()
+        # Write chunks to JSONL in one go (overwriting output from a previous upload)
+        with open(output_file, 'wb') as f:
+            f.writelines(orjson.dumps(chunk_data) + b'\n' for chunk_data in chunks)
+        write_chunk_stats(
+            output_file,
+            chunks_count=len(chunks),
+            pages_count=pages_processed,  # Every processed page yields at least one chunk
+            source=source
+        )
         
-        print(f"[PDF] Completed: {chunks_created} chunks from {pages_processed} pages")
+        print(f"[PDF] Completed: {len(chunks)} chunks from {pages_processed} pages")
         
         return {
             "success": True,
-            "filename": pdf_path.name,
-            "chunks_created": chunks_created,
+            "filename": source,
+            "chunks_created": len(chunks),
             "pages_processed": pages_processed,
             "total_pages": total_pages,
-            "output_file": str(output_file)
+            "output_file": str(output_file),
+            "chunks": chunks
         }
     
     except Exception as e:
         print(f"[ERROR] Failed to process PDF {pdf_name}: {e}")
         return {
             "success": False,
-            "filename": pdf_path.name,
+            "filename": source,
             "error": str(e)
         }
 
 
-def process_uploaded_pdf(file_content: bytes, filename: str, output_dir: Path) -> Dict:
+def process_uploaded_pdf(file_content: Union[bytes, BinaryIO, Path], filename: str, output_dir: Path) -> Dict:
     """
     Process an uploaded PDF file.
     
+    The PDF is read where it already is (on disk or in memory), without a
+    temporary copy.
+    
     Args:
-        file_content: PDF file content as bytes
+        file_content: PDF file content as bytes, a binary file object, or a path
+            to a file already on disk
         filename: Original filename
         output_dir: Directory to save JSONL chunks
     
     Returns:
         Dictionary with processing results
     """
-    import tempfile
-    
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(file_content)
-        tmp_path = Path(tmp_file.name)
-    
     try:
-        # Process the PDF
-        result = process_pdf(tmp_path, output_dir)
-        
-        # Clean up temp file
-        tmp_path.unlink()
-        
-        return result
-    
+        if isinstance(file_content, (Path, bytes, bytearray)):
+            pdf = file_content
+        elif isinstance(file_content, memoryview):
+            pdf = file_content.tobytes()
+        else:
+            pdf = file_content.read()
     except Exception as e:
-        # Clean up temp file on error
-        if tmp_path.exists():
-            tmp_path.unlink()
         return {
             "success": False,
             "filename": filename,
             "error": str(e)
         }
-
+    
+    # Chunk sources and the JSONL output file use the uploaded filename
+    return process_pdf(pdf, output_dir, filename)
@@ -1,14 +1,220 @@
 """RAG implementation - loads chunks and queries OpenRouter."""
-import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import orjson
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterator
+import numpy as np
 import requests
 
 from backend.config import (
     OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
-    CHUNK_DIR, TOP_K
+    CHUNK_DIR, TOP_K, CONTEXT_MAX_CHARS, RESPONSE_CACHE_ENABLED
 )
-from backend.rate_limiter import wait_for_rate_limit
+from backend.embeddings import generate_embedding
+from backend.http_session import openrouter_session
+from backend.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Bulletin detection: "bulletin 113", "bulletin-113", "bulletin113" (a decimal
+# like "bulletin 113.5" matches its integer part, as before)
+BULLETIN_RE = re.compile(r'bulletin[\s\-]?(\d+)')
+NUMBER_RE = re.compile(r'\d+')
+
+# Response cleanup
+EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([,.!?;:])')
+PUNCT_BEFORE_CAPITAL_RE = re.compile(r'([,.!?;:])\s*([A-Z])')
+PERIOD_BEFORE_CAPITAL_RE = re.compile(r'\.([A-Z])')
+
+# Word tokens for keyword scoring in the file-system fallback
+TOKEN_RE = re.compile(r'\w+')
+
+# Question words that say nothing about which chunk is relevant
+STOP_WORDS = frozenset({
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does',
+    'for', 'from', 'how', 'i', 'in', 'is', 'it', 'me', 'of', 'on', 'or', 'tell',
+    'that', 'the', 'this', 'to', 'what', 'when', 'where', 'which', 'who', 'why',
+    'with', 'you'
+})
+
+# Chunk file -> (mtime, chunks, term counts), so the file-system fallback only
+# re-reads and re-tokenizes files that changed since the last query
+_chunk_file_terms = {}
+
+# BM25 ranking for the file-system fallback
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Inverted index over all chunk files: (files key, chunks, postings, length norms).
+# Postings map term -> (chunk ids, term frequencies); rebuilt when any file changes
+_chunk_index = None
+
+# In-process TTL + LRU cache of retrieved chunks, keyed on (normalized question,
+# top_k). Uploads and deletes clear it; the TTL bounds staleness in other processes
+CHUNK_CACHE_SIZE = 256
+CHUNK_CACHE_TTL = 300.0  # Seconds
+_chunk_cache = OrderedDict()  # (question, top_k) -> (expires_at, chunks)
+_chunk_cache_lock = threading.Lock()
+
+
+# Upper bound on the exponential backoff between OpenRouter retries (seconds)
+MAX_RETRY_BACKOFF = 30
+RETRY_BASE_DELAY = 0.5  # Shortest wait before retrying a failed request (seconds)
+RETRY_JITTER = 0.5  # Random extra seconds added to rate-limit waits
+PREWARM_TIMEOUT = 5  # Seconds
+
+# Longest excerpt of a single chunk included in the prompt
+CONTEXT_CHUNK_CHARS = 1500
+
+# Default for load_relevant_chunks' bulletin_source: detect it from the query
+DETECT_BULLETIN = object()
+
+
+def clear_chunk_cache():
+    """Drop all cached retrieval results (call after chunks are added or removed)."""
+    with _chunk_cache_lock:
+        _chunk_cache.clear()
+
+
+def read_chunk_file(chunk_file: Path) -> List[Dict]:
+    """
+    Read all chunks from a JSONL chunk file.
+    
+    The file is read in one call and split once, instead of iterating line by line,
+    and map/filter keep the per-line loop in C.
+    
+    Args:
+        chunk_file: Path to a .jsonl chunk file
+    
+    Returns:
+        List of chunk dictionaries
+    """
+    return list(map(orjson.loads, filter(bytes.strip, chunk_file.read_bytes().splitlines())))
+
+
+def read_chunk_file_terms(chunk_file: Path) -> Tuple[List[Dict], List[Counter]]:
+    """
+    Read a chunk file along with the lowercased word counts of each chunk.
+    
+    Results are cached per file until its modification time changes.
+    
+    Args:
+        chunk_file: Path to a .jsonl chunk file
+    
+    Returns:
+        (chunks, term counts) with one Counter per chunk
+    """
+    mtime = chunk_file.stat().st_mtime
+    cached = _chunk_file_terms.get(chunk_file)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    
+    chunks = read_chunk_file(chunk_file)
+    term_counts = [Counter(TOKEN_RE.findall(chunk.get('text', '').lower())) for chunk in chunks]
+    _chunk_file_terms[chunk_file] = (mtime, chunks, term_counts)
+    return chunks, term_counts
+
+
+def get_chunk_index(chunk_files: List[Path]) -> Tuple[List[Dict], Dict[str, Tuple[np.ndarray, np.ndarray]], np.ndarray]:
+    """
+    Get the inverted index over the given chunk files, building it if they changed.
+    
+    Args:
+        chunk_files: Paths to .jsonl chunk files
+    
+    Returns:
+        (chunks, postings, length norms): postings map each term to the ids of
+        the chunks containing it and its frequency in each; length norms hold
+        BM25's per-chunk k1 * (1 - b + b * length / average length)
+    """
+    global _chunk_index
+    chunk_files = sorted(chunk_files)
+    key = tuple((chunk_file, chunk_file.stat().st_mtime) for chunk_file in chunk_files)
+    if _chunk_index and _chunk_index[0] == key:
+        return _chunk_index[1:]
+    
+    chunks = []
+    doc_lens = []
+    term_ids = {}  # term -> ([chunk ids], [term frequencies])
+    complete = True
+    for chunk_file in chunk_files:
+        try:
+            file_chunks, term_counts = read_chunk_file_terms(chunk_file)
+        except Exception as file_error:
+            logger.error("Failed to load chunk file %s: %s", chunk_file.name, file_error)
+            complete = False  # Don't cache, so the file is retried next query
+            continue
+        for chunk, counts in zip(file_chunks, term_counts):
+            chunk_id = len(chunks)
+            chunks.append(chunk)
+            doc_lens.append(sum(counts.values()))
+            for term, count in counts.items():
+                posting = term_ids.get(term)
+                if posting is None:
+                    posting = term_ids[term] = ([], [])
+                posting[0].append(chunk_id)
+                posting[1].append(count)
+    
+    postings = {
+        term: (np.array(ids, dtype=np.intp), np.array(counts, dtype=np.float64))
+        for term, (ids, counts) in term_ids.items()
+    }
+    doc_lens = np.array(doc_lens, dtype=np.float64)
+    avg_len = doc_lens.mean() if len(doc_lens) else 0.0
+    length_norms = BM25_K1 * (1 - BM25_B + BM25_B * doc_lens / max(avg_len, 1.0))
+    
+    logger.info("Indexed %d chunks (%d terms) from %d files", len(chunks), len(postings), len(chunk_files))
+    if complete:
+        _chunk_index = (key, chunks, postings, length_norms)
+    return chunks, postings, length_norms
+
+
+def rank_chunks_bm25(query: str, chunk_files: List[Path], top_k: int) -> List[Dict]:
+    """
+    Rank chunks from the given files against a query with BM25.
+    
+    Only the posting lists of the query's terms are touched, so the cost
+    scales with how often those terms occur rather than with the corpus size.
+    
+    Args:
+        query: Search query
+        chunk_files: Paths to .jsonl chunk files
+        top_k: Maximum number of chunks to return
+    
+    Returns:
+        Chunks containing at least one query term, best match first
+    """
+    chunks, postings, length_norms = get_chunk_index(chunk_files)
+    n = len(chunks)
+    if not n or top_k <= 0:
+        return []
+    
+    scores = np.zeros(n)
+    for term in set(TOKEN_RE.findall(query.lower())) - STOP_WORDS:
+        posting = postings.get(term)
+        if posting is None:
+            continue
+        ids, counts = posting
+        # Chunk ids are unique within a posting list, so plain fancy-index
+        # accumulation is safe (no np.add.at needed)
+        idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+        scores[ids] += idf * counts * (BM25_K1 + 1) / (counts + length_norms[ids])
+    
+    # Only the top_k are needed, so partition before sorting
+    matched = np.flatnonzero(scores)
+    if len(matched) > top_k:
+        matched = matched[np.argpartition(scores[matched], -top_k)[-top_k:]]
+    matched = matched[np.argsort(-scores[matched], kind='stable')]
+    return [chunks[i] for i in matched]
 
 
 def detect_bulletin_query(query: str) -> Optional[str]:
@@ -16,7 +222,6 @@ def detect_bulletin_query(query: str) -> Optional[str]:
     Detect if query is asking about a specific bulletin.
     Returns the bulletin identifier (e.g., "Bulletin-113", "bulletin 113", "113") or None.
     """
-    import re
     query_lower = query.lower()
     
     # Patterns to detect bulletin queries:
@@ -27,68 +232,95 @@ def detect_bulletin_query(query: str) -> Optional[str]:
     # - "analyze bulletin 113"
     
     # Match patterns like "bulletin 113", "bulletin-113", "bulletin113"
-    patterns = [
-        r'bulletin[\s\-]?(\d+)',  # "bulletin 113", "bulletin-113", "bulletin113"
-        r'bulletin[\s\-]?(\d+\.\d+)',  # "bulletin 113.5"
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, query_lower)
-        if match:
-            bulletin_num = match.group(1)
-            # Return in format that matches source filenames (e.g., "Bulletin-113")
-            return f"Bulletin-{bulletin_num}"
+    match = BULLETIN_RE.search(query_lower)
+    if match:
+        # Return in format that matches source filenames (e.g., "Bulletin-113")
+        return f"Bulletin-{match.group(1)}"
     
     # Also check if query mentions "bulletin" and contains a number
     if 'bulletin' in query_lower:
-        # Extract any number in the query
-        numbers = re.findall(r'\d+', query)
-        if numbers:
-            return f"Bulletin-{numbers[0]}"
+        # Use the first number in the query
+        number = NUMBER_RE.search(query)
+        if number:
+            return f"Bulletin-{number.group()}"
     
     return None
 
 
-def load_relevant_chunks(query: str, top_k: int = None) -> List[Dict]:
+def load_relevant_chunks(query: str, top_k: int = None, query_embedding: Optional[List[float]] = None,
+                         bulletin_source=DETECT_BULLETIN) -> List[Dict]:
     """
     Load relevant chunks from database (preferred) or file system (fallback).
     If query is about a specific bulletin, loads ALL chunks from that bulletin.
     
+    Non-empty database results are cached for CHUNK_CACHE_TTL seconds per
+    normalized question. Empty results and file-system fallbacks are not, so a
+    transient database error doesn't pin degraded retrieval.
+    
     Args:
         query: User's question
         top_k: Number of chunks to retrieve (ignored if bulletin query detected)
+        query_embedding: Precomputed embedding of the question (generated if None)
+        bulletin_source: Result of detect_bulletin_query(query), if the caller
+            already has it (detected here by default)
     
     Returns:
         List of relevant chunk dictionaries
     """
     if top_k is None:
         top_k = TOP_K
+    if bulletin_source is DETECT_BULLETIN:
+        bulletin_source = detect_bulletin_query(query)
+    
+    cache_key = (" ".join(query.lower().split()), top_k)
+    now = time.monotonic()
+    with _chunk_cache_lock:
+        cached = _chunk_cache.get(cache_key)
+        if cached and cached[0] > now:
+            _chunk_cache.move_to_end(cache_key)
+            logger.info("Retrieval cache hit")
+            return list(cached[1])
+    
+    result, from_database = _retrieve_chunks(query, top_k, query_embedding, bulletin_source)
+    
+    if result and from_database:
+        with _chunk_cache_lock:
+            _chunk_cache[cache_key] = (now + CHUNK_CACHE_TTL, result)
+            _chunk_cache.move_to_end(cache_key)
+            while len(_chunk_cache) > CHUNK_CACHE_SIZE:
+                _chunk_cache.popitem(last=False)
+    return list(result)
+
+
+def _retrieve_chunks(query: str, top_k: int, query_embedding: Optional[List[float]],
+                     bulletin_source: Optional[str]) -> Tuple[List[Dict], bool]:
+    """
+    Run the database / file system retrieval behind load_relevant_chunks.
     
-    query_lower = query.lower()
-    query_terms = query_lower.split()
-    
-    # Check if this is a bulletin query
-    bulletin_source = detect_bulletin_query(query)
-    
+    Returns:
+        (chunks, whether they came from the database rather than the file fallback)
+    """
     all_chunks = []
+    from_database = False
     
     # Try to load from database first
     try:
         from backend.database.repository import ChunkRepository
-        print(f"[RAG] Loading chunks from database...")
+        logger.info("Loading chunks from database")
         
         if bulletin_source:
-            # Load ALL chunks from the specific bulletin
-            print(f"[RAG] Detected bulletin query - Loading ALL chunks from {bulletin_source}")
+            # Load ALL chunks from the specific bulletin (ordered by page in SQL)
+            logger.info("Detected bulletin query - loading all chunks from %s", bulletin_source)
             db_chunks = ChunkRepository.get_by_source(bulletin_source)
-            print(f"[RAG] Found {len(db_chunks)} chunks from {bulletin_source}")
+            logger.info("Found %d chunks from %s", len(db_chunks), bulletin_source)
             
-            # Sort by page number for better organization
-            db_chunks.sort(key=lambda x: x.get('page', 0))
+            if not db_chunks:
+                # The bulletin may be stored under another name; search for it instead
+                db_chunks = ChunkRepository.search_by_text(query, limit=top_k, query_embedding=query_embedding)
         else:
             # Use semantic search (which falls back to text search if needed)
-            # Semantic search already returns chunks ordered by relevance
-            db_chunks = ChunkRepository.search_by_text(query, limit=top_k * 2)
+            # Ranking happens there, so fetch only the top_k rows that get used
+            db_chunks = ChunkRepository.search_by_text(query, limit=top_k, query_embedding=query_embedding)
         
         for db_chunk in db_chunks:
             chunk_dict = {
@@ -98,177 +330,319 @@ def load_relevant_chunks(query: str, top_k: int = None) -> List[Dict]:
             }
             all_chunks.append(chunk_dict)
         
-        print(f"[RAG] Loaded {len(all_chunks)} chunks from database")
+        from_database = True
+        logger.info("Loaded %d chunks from database", len(all_chunks))
     except Exception as e:
-        print(f"[WARNING] Failed to load from database: {e}")
-        print(f"[RAG] Falling back to file system...")
+        logger.warning("Failed to load from database, falling back to file system: %s", e)
         
         # Fallback to file system
         if bulletin_source:
-            # Try to find chunks from the bulletin file
-            bulletin_filename = f"{bulletin_source.lower()}.jsonl"
-            chunk_file = CHUNK_DIR / bulletin_filename
-            if chunk_file.exists():
-                print(f"[RAG] Loading chunks from {bulletin_filename}")
+            # Try to find chunks from the bulletin file ("Bulletin-113.jsonl" or
+            # "Bulletin-113-<title>.jsonl", named after the PDF)
+            bulletin_files = [CHUNK_DIR / f"{bulletin_source}.jsonl", *CHUNK_DIR.glob(f"{bulletin_source}-*.jsonl")]
+            for chunk_file in bulletin_files:
+                if not chunk_file.exists():
+                    continue
+                logger.info("Loading chunks from %s", chunk_file.name)
                 try:
-                    with open(chunk_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if line.strip():
-                                chunk = json.loads(line)
-                                all_chunks.append(chunk)
+                    all_chunks.extend(read_chunk_file(chunk_file))
                 except Exception as file_error:
-                    print(f"[ERROR] Failed to load chunk file {chunk_file.name}: {file_error}")
-        else:
-            # Load from all files
+                    logger.error("Failed to load chunk file %s: %s", chunk_file.name, file_error)
+        
+        if not all_chunks:
+            # Rank chunks from all files with BM25 over a cached inverted index
             chunk_files = list(CHUNK_DIR.glob("*.jsonl"))
-            print(f"[RAG] Loading chunks from {len(chunk_files)} files...")
-            
-            for chunk_file in chunk_files:
-                try:
-                    with open(chunk_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if line.strip():
-                                chunk = json.loads(line)
-                                all_chunks.append(chunk)
-                except Exception as file_error:
-                    print(f"[ERROR] Failed to load chunk file {chunk_file.name}: {file_error}")
-                    continue
+            logger.info("Loading chunks from %d files", len(chunk_files))
+            all_chunks = rank_chunks_bm25(query, chunk_files, top_k)
         
-        print(f"[RAG] Loaded {len(all_chunks)} total chunks from files")
+        logger.info("Loaded %d total chunks from files", len(all_chunks))
     
     if not all_chunks:
-        print("[WARNING] No chunks found!")
-        return []
+        logger.warning("No chunks found")
+        return [], from_database
+    
+    # Drop exact duplicates (a PDF stored under two names, or rows repeated by
+    # older re-uploads), which would only repeat themselves in the prompt
+    seen_texts = set()
+    unique_chunks = []
+    for chunk in all_chunks:
+        text = chunk.get('text', '')
+        if text not in seen_texts:
+            seen_texts.add(text)
+            unique_chunks.append(chunk)
+    all_chunks = unique_chunks
     
     # If bulletin query, return all chunks (already sorted by page)
     if bulletin_source:
-        print(f"[RAG] Returning all {len(all_chunks)} chunks from {bulletin_source} for comprehensive analysis")
-        return all_chunks
+        logger.info("Returning all %d chunks from %s for comprehensive analysis", len(all_chunks), bulletin_source)
+        return all_chunks, from_database
     
-    # For regular queries, semantic search already returns chunks ordered by relevance
-    # Just return the top_k chunks (they're already sorted by similarity)
+    # For regular queries, semantic search (or the fallback's keyword scoring) already
+    # returns chunks ordered by relevance, so just return the top_k chunks
     result = all_chunks[:top_k]
     
     if result:
-        print(f"[RAG] Returning {len(result)} most relevant chunks from semantic search")
+        logger.info("Returning %d most relevant chunks from semantic search", len(result))
     else:
-        print(f"[RAG] No chunks found for query")
+        logger.info("No chunks found for query")
     
-    return result
+    return result, from_database
 
 
-def query_openrouter(messages: List[Dict], max_retries: int = 3) -> Optional[str]:
+def prewarm_openrouter():
     """
-    Query OpenRouter API.
+    Open a pooled connection to OpenRouter in the background.
+    
+    Call once at startup, so the first question doesn't pay for the DNS lookup
+    and TLS handshake. Any response (even an error status) leaves a warm
+    keep-alive connection in the shared session.
+    """
+    if not OPENROUTER_API_KEY:
+        return
+    
+    def connect():
+        try:
+            openrouter_session.head(f"{OPENROUTER_BASE_URL}/models", timeout=PREWARM_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            logger.info("OpenRouter prewarm failed: %s", e)
+    
+    threading.Thread(target=connect, name="openrouter-prewarm", daemon=True).start()
+
+
+def retry_backoff(attempt: int) -> float:
+    """
+    Seconds to wait before retrying after a failed attempt.
+    
+    Decorrelated-style jitter: a random wait between RETRY_BASE_DELAY and a
+    ceiling that triples per attempt (capped), so a transient error retries
+    within about a second and concurrent requests don't retry in lockstep.
+    """
+    return random.uniform(RETRY_BASE_DELAY, min(RETRY_BASE_DELAY * 3 ** (attempt + 1), MAX_RETRY_BACKOFF))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given as delay seconds or as an HTTP date.
     
     Args:
-        messages: List of message dictionaries
-        max_retries: Maximum retry attempts
+        value: Header value (None if the header is missing)
     
     Returns:
-        Response text or None
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+CHAT_COMPLETIONS_URL = f"{OPENROUTER_BASE_URL}/chat/completions"
+CHAT_HEADERS = {
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "Content-Type": "application/json",
+    "HTTP-Referer": "https://github.com/asfc",
+    "X-Title": "ASFC Chat"
+}
+# Streamed replies: connect timeout, then the longest pause between tokens
+STREAM_TIMEOUT = (10, 120)
+SSE_DATA_PREFIX = b"data: "
+
+
+def chat_payload(messages: List[Dict], stream: bool = False) -> Dict:
     """
-    url = f"{OPENROUTER_BASE_URL}/chat/completions"
+    Build the OpenRouter chat completion payload.
     
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://github.com/asfc",
-        "X-Title": "ASFC Chat"
-    }
+    Args:
+        messages: List of message dictionaries
+        stream: Ask for the reply as server-sent events
     
+    Returns:
+        Request payload
+    """
     payload = {
         "model": OPENROUTER_MODEL,
         "messages": messages,
         "temperature": 0.7,
         "max_tokens": 4000  # Increased for more comprehensive responses
     }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def query_openrouter(messages: List[Dict], max_retries: int = 3) -> Optional[str]:
+    """
+    Query OpenRouter API.
+    
+    Args:
+        messages: List of message dictionaries
+        max_retries: Maximum retry attempts
+    
+    Returns:
+        Response text or None
+    """
+    payload = chat_payload(messages)
     
     for attempt in range(max_retries):
         try:
             # Send request immediately - no wait
-            print(f"[OPENROUTER] Attempt {attempt + 1}/{max_retries} - Calling {OPENROUTER_MODEL}")
-            response = requests.post(url, json=payload, headers=headers, timeout=60)
+            logger.info("OpenRouter attempt %d/%d - calling %s", attempt + 1, max_retries, OPENROUTER_MODEL)
+            response = openrouter_session.post(CHAT_COMPLETIONS_URL, json=payload, headers=CHAT_HEADERS, timeout=60)
             
             if response.status_code == 200:
                 data = response.json()
                 if 'choices' in data and len(data['choices']) > 0:
-                    print("[OPENROUTER] Success - Response received")
+                    logger.info("OpenRouter response received")
                     return data['choices'][0]['message']['content']
-                print("[ERROR] OpenRouter returned 200 but no choices in response")
+                logger.error("OpenRouter returned 200 but no choices in response")
                 return None
             elif response.status_code == 429:
-                import time
-                # Get retry-after header if available
-                retry_after = response.headers.get('retry-after', None)
-                if retry_after:
-                    try:
-                        wait_time = int(retry_after)
-                    except:
-                        wait_time = None
-                else:
-                    wait_time = None
-                
-                # Quick retry with minimal wait
+                # Honor retry-after if available, otherwise retry quickly (2 seconds);
+                # jitter keeps concurrent requests from retrying in lockstep
+                wait_time = parse_retry_after(response.headers.get('retry-after'))
                 if wait_time is None:
-                    wait_time = 2  # Just 2 seconds between retries
+                    wait_time = 2
+                wait_time = min(wait_time, MAX_RETRY_BACKOFF) + random.uniform(0, RETRY_JITTER)
                 
-                print(f"[ERROR] Rate limited (429) - Waiting {wait_time}s before retry {attempt + 1}/{max_retries}...")
+                logger.warning("Rate limited (429) - waiting %.1fs before retry %d/%d", wait_time, attempt + 1, max_retries)
                 
                 if attempt < max_retries - 1:
                     time.sleep(wait_time)
-                    print("   Retrying now...")
                 else:
-                    print(f"[ERROR] Exhausted all retry attempts after {max_retries} tries")
+                    logger.error("Exhausted all retry attempts after %d tries", max_retries)
                     return None
             elif response.status_code == 404:
-                print(f"[ERROR] Model not found (404): {OPENROUTER_MODEL}")
-                print(f"[ERROR] Response: {response.text[:500]}")
+                logger.error("Model not found (404): %s - %s", OPENROUTER_MODEL, response.text[:500])
                 return None  # Don't retry if model doesn't exist
             elif response.status_code == 401:
-                print(f"[ERROR] Authentication failed (401) - Check API key")
-                print(f"[ERROR] Response: {response.text[:500]}")
+                logger.error("Authentication failed (401) - check API key: %s", response.text[:500])
                 return None  # Don't retry if auth failed
             else:
                 error_text = response.text[:500] if hasattr(response, 'text') else str(response.content)[:500]
-                print(f"[ERROR] OpenRouter API error {response.status_code}: {error_text}")
+                logger.error("OpenRouter API error %s: %s", response.status_code, error_text)
                 if attempt < max_retries - 1:
-                    import time
-                    time.sleep(2 ** attempt)
+                    time.sleep(retry_backoff(attempt))
         
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Request exception: {type(e).__name__}: {str(e)}")
+            logger.error("Request exception: %s: %s", type(e).__name__, e)
             if attempt < max_retries - 1:
-                import time
-                time.sleep(2 ** attempt)
+                time.sleep(retry_backoff(attempt))
     
-    print("[ERROR] All retry attempts failed")
+    logger.error("All retry attempts failed")
     return None
 
 
-def ask_with_rag(question: str) -> str:
+def stream_openrouter(messages: List[Dict], max_retries: int = 3) -> Iterator[str]:
     """
-    Ask a question using RAG - loads relevant chunks and queries OpenRouter.
+    Query OpenRouter API, yielding the reply as it is generated.
+    
+    Failed attempts are retried like query_openrouter, but only until the
+    first token has been yielded; a stream that breaks later just ends.
     
     Args:
-        question: User's question
+        messages: List of message dictionaries
+        max_retries: Maximum retry attempts
     
-    Returns:
-        Assistant's response
+    Yields:
+        Pieces of the response text
     """
-    if not OPENROUTER_API_KEY:
-        print("[ERROR] OPENROUTER_API_KEY not set in .env")
-        return "Error: OPENROUTER_API_KEY not set in .env"
+    payload = chat_payload(messages, stream=True)
     
-    print(f"[RAG] Processing question: {question[:80]}...")
+    for attempt in range(max_retries):
+        started = False
+        try:
+            logger.info("OpenRouter stream attempt %d/%d - calling %s", attempt + 1, max_retries, OPENROUTER_MODEL)
+            with openrouter_session.post(CHAT_COMPLETIONS_URL, json=payload, headers=CHAT_HEADERS,
+                                         stream=True, timeout=STREAM_TIMEOUT) as response:
+                if response.status_code == 200:
+                    for line in response.iter_lines():
+                        # Skip keep-alive comments (": OPENROUTER PROCESSING") and blank lines
+                        if not line.startswith(SSE_DATA_PREFIX):
+                            continue
+                        data = line[len(SSE_DATA_PREFIX):]
+                        if data == b"[DONE]":
+                            break
+                        choices = orjson.loads(data).get('choices')
+                        content = choices[0].get('delta', {}).get('content') if choices else None
+                        if content:
+                            started = True
+                            yield content
+                    logger.info("OpenRouter stream finished")
+                    return
+                elif response.status_code == 429:
+                    wait_time = parse_retry_after(response.headers.get('retry-after'))
+                    if wait_time is None:
+                        wait_time = 2
+                    wait_time = min(wait_time, MAX_RETRY_BACKOFF) + random.uniform(0, RETRY_JITTER)
+                    logger.warning("Rate limited (429) - waiting %.1fs before retry %d/%d", wait_time, attempt + 1, max_retries)
+                elif response.status_code in (401, 404):
+                    logger.error("OpenRouter API error %s: %s", response.status_code, response.text[:500])
+                    return  # Don't retry a missing model or a bad key
+                else:
+                    logger.error("OpenRouter API error %s: %s", response.status_code, response.text[:500])
+                    wait_time = retry_backoff(attempt)
+        
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.error("Stream exception: %s: %s", type(e).__name__, e)
+            if started:
+                return  # Part of the reply is already out; a retry would repeat it
+            wait_time = retry_backoff(attempt)
+        
+        if attempt < max_retries - 1:
+            time.sleep(wait_time)
     
-    # Load relevant chunks
-    relevant_chunks = load_relevant_chunks(question, top_k=TOP_K)
+    logger.error("All retry attempts failed")
+
+
+def select_context_chunks(chunks: List[Dict], max_chars: int = CONTEXT_MAX_CHARS) -> List[Dict]:
+    """
+    Keep as many chunks as fit in the prompt's character budget.
     
-    messages = []
+    When a bulletin is too long to send whole, chunks are taken alternately from
+    its start and its end (where the overview and conclusions usually are), then
+    returned in their original order.
     
-    # System message
-    system_prompt = """You are ASFC, an expert aviation and technical documentation assistant. Your role is to provide comprehensive, in-depth analysis based on the provided documentation context.
+    Args:
+        chunks: Chunks in page order
+        max_chars: Budget for the chunk text included in the prompt
+    
+    Returns:
+        The chunks to include in the prompt
+    """
+    sizes = [min(len(chunk.get('text', '')), CONTEXT_CHUNK_CHARS) for chunk in chunks]
+    if sum(sizes) <= max_chars:
+        return chunks
+    
+    kept = []
+    used = 0
+    head, tail = 0, len(chunks) - 1
+    from_head = True
+    while head <= tail:
+        index = head if from_head else tail
+        if used + sizes[index] > max_chars:
+            break
+        used += sizes[index]
+        kept.append(index)
+        if from_head:
+            head += 1
+        else:
+            tail -= 1
+        from_head = not from_head
+    
+    return [chunks[index] for index in sorted(kept)]
+
+
+# Prompts for ask_with_rag; the user prompts are filled in with str.format
+SYSTEM_PROMPT = """You are ASFC, an expert aviation and technical documentation assistant. Your role is to provide comprehensive, in-depth analysis based on the provided documentation context.
 
 ANALYSIS REQUIREMENTS - Provide DEEP, THOROUGH answers:
 - Analyze the question from multiple angles and perspectives
@@ -302,29 +676,8 @@ FORMATTING:
 - Use headings or bold text for key sections when helpful
 - Write in a professional, authoritative style
 - Ensure logical flow from general to specific information"""
-    
-    messages.append({
-        "role": "system",
-        "content": system_prompt
-    })
-    
-    # Build context from chunks
-    if relevant_chunks:
-        context_parts = []
-        for chunk in relevant_chunks:
-            source = chunk.get('source', 'unknown')
-            page = chunk.get('page', '?')
-            text = chunk.get('text', '')[:1500]
-            context_parts.append(f"[From {source}, Page {page}]\n{text}")
-        
-        context_text = "\n\n---\n\n".join(context_parts)
-        
-        # Check if this is a bulletin analysis query
-        is_bulletin_query = detect_bulletin_query(question) is not None
-        
-        if is_bulletin_query:
-            # Special prompt for bulletin analysis
-            user_message = f"""Complete Bulletin Documentation:
+
+BULLETIN_PROMPT_TEMPLATE = """Complete Bulletin Documentation:
 
 {context_text}
 
@@ -381,9 +734,8 @@ STRUCTURE YOUR RESPONSE:
 - End with a summary of key points and takeaways
 
 Provide the MOST COMPREHENSIVE analysis possible - analyze EVERYTHING in this bulletin, not just a summary."""
-        else:
-            # Regular query prompt
-            user_message = f"""Context from documentation:
+
+CONTEXT_PROMPT_TEMPLATE = """Context from documentation:
 
 {context_text}
 
@@ -418,30 +770,157 @@ Please provide a COMPREHENSIVE, IN-DEPTH answer based on the context provided ab
    - End with key takeaways if the answer is lengthy
 
 If the context doesn't contain enough information to fully answer the question, acknowledge what information is available and what is missing. Provide the most comprehensive answer possible based on what is available."""
-    else:
-        user_message = f"""Question: {question}
+
+NO_CONTEXT_PROMPT_TEMPLATE = """Question: {question}
 
 Note: No relevant context found in the documentation. Please answer based on your general knowledge."""
+
+
+RATE_LIMIT_MESSAGE = "I'm currently unable to process your question due to rate limiting. Please wait 30 seconds and try again. The system is automatically managing request timing to avoid errors."
+
+
+def prepare_rag_messages(question: str) -> Tuple[Optional[str], List[Dict], Optional[List[float]]]:
+    """
+    Build the LLM messages for a question, unless it can be answered without one.
+    
+    Args:
+        question: User's question
+    
+    Returns:
+        Tuple of (ready answer or None, messages, question embedding or None);
+        messages is empty when the ready answer is set
+    """
+    if not OPENROUTER_API_KEY:
+        logger.error("OPENROUTER_API_KEY not set in .env")
+        return "Error: OPENROUTER_API_KEY not set in .env", [], None
+    
+    logger.info("Processing question (%d chars)", len(question))
+    
+    # Answer repeated / paraphrased questions from the response cache
+    query_embedding = None
+    if RESPONSE_CACHE_ENABLED:
+        cached_response = response_cache.get_exact(question)
+        if cached_response is None:
+            query_embedding = generate_embedding(question)
+            if query_embedding:
+                cached_response = response_cache.get(query_embedding)
+        if cached_response is not None:
+            logger.info("Response cache hit")
+            return cached_response, [], query_embedding
+    
+    # Load relevant chunks (reusing the question embedding for semantic search)
+    bulletin_source = detect_bulletin_query(question)
+    relevant_chunks = load_relevant_chunks(question, top_k=TOP_K, query_embedding=query_embedding,
+                                           bulletin_source=bulletin_source)
+    
+    messages = []
+    
+    # System message
+    messages.append({
+        "role": "system",
+        "content": SYSTEM_PROMPT
+    })
+    
+    # A named bulletin that isn't in the database or the chunk files would only
+    # get a generic answer, so say so without an LLM round trip
+    if bulletin_source and not relevant_chunks:
+        logger.info("No chunks found for %s", bulletin_source)
+        return f"I couldn't find {bulletin_source} in the uploaded documents. Please check the bulletin number, or upload the bulletin first.", [], query_embedding
+    
+    # Build context from chunks
+    if relevant_chunks:
+        # Whole bulletins can exceed the model's context window
+        context_chunks = select_context_chunks(relevant_chunks)
+        if len(context_chunks) < len(relevant_chunks):
+            logger.info("Context budget: using %d of %d chunks", len(context_chunks), len(relevant_chunks))
+        
+        # Chunks are at most 1000 characters, so the CONTEXT_CHUNK_CHARS guard
+        # returns the text itself rather than a copy
+        context_text = "\n\n---\n\n".join(
+            f"[From {chunk.get('source', 'unknown')}, Page {chunk.get('page', '?')}]\n{chunk.get('text', '')[:CONTEXT_CHUNK_CHARS]}"
+            for chunk in context_chunks
+        )
+        
+        # Whole-bulletin analysis, unless the bulletin wasn't found by name and
+        # these chunks came from the regular search (sources start with the name)
+        if bulletin_source and relevant_chunks[0].get('source', '').lower().startswith(bulletin_source.lower()):
+            # Special prompt for bulletin analysis
+            user_message = BULLETIN_PROMPT_TEMPLATE.format(context_text=context_text, question=question)
+        else:
+            # Regular query prompt
+            user_message = CONTEXT_PROMPT_TEMPLATE.format(context_text=context_text, question=question)
+    else:
+        user_message = NO_CONTEXT_PROMPT_TEMPLATE.format(question=question)
     
     messages.append({
         "role": "user",
         "content": user_message
     })
     
+    logger.info("Sending to %s with %d context chunks", OPENROUTER_MODEL, len(relevant_chunks))
+    return None, messages, query_embedding
+
+
+def ask_with_rag(question: str) -> str:
+    """
+    Ask a question using RAG - loads relevant chunks and queries OpenRouter.
+    
+    Args:
+        question: User's question
+    
+    Returns:
+        Assistant's response
+    """
+    answer, messages, query_embedding = prepare_rag_messages(question)
+    if answer is not None:
+        return answer
+    
     # Query OpenRouter
-    print(f"[RAG] Sending to OpenRouter with {len(relevant_chunks)} context chunks")
-    print(f"[RAG] Using model: {OPENROUTER_MODEL}")
     response = query_openrouter(messages)
     
     if response:
-        print("[RAG] Successfully generated response")
+        logger.info("Successfully generated response")
         # Clean up the response for better readability
         cleaned_response = clean_response(response)
+        if RESPONSE_CACHE_ENABLED:
+            response_cache.put(question, query_embedding, cleaned_response)
         return cleaned_response
     else:
-        print("[ERROR] Failed to get response from OpenRouter")
+        logger.error("Failed to get response from OpenRouter")
         # Return a shorter, more helpful message
-        return "I'm currently unable to process your question due to rate limiting. Please wait 30 seconds and try again. The system is automatically managing request timing to avoid errors."
+        return RATE_LIMIT_MESSAGE
+
+
+def ask_with_rag_stream(question: str) -> Iterator[str]:
+    """
+    Ask a question using RAG, yielding the response as it is generated.
+    
+    Tokens are passed through as OpenRouter produces them; the cleaned-up
+    full response is what goes into the response cache.
+    
+    Args:
+        question: User's question
+    
+    Yields:
+        Pieces of the assistant's response
+    """
+    answer, messages, query_embedding = prepare_rag_messages(question)
+    if answer is not None:
+        yield answer
+        return
+    
+    parts = []
+    for content in stream_openrouter(messages):
+        parts.append(content)
+        yield content
+    
+    if parts:
+        logger.info("Successfully streamed response")
+        if RESPONSE_CACHE_ENABLED:
+            response_cache.put(question, query_embedding, clean_response("".join(parts)))
+    else:
+        logger.error("Failed to get response from OpenRouter")
+        yield RATE_LIMIT_MESSAGE
 
 
 def clean_response(text: str) -> str:
@@ -457,29 +936,19 @@ def clean_response(text: str) -> str:
     if not text:
         return text
     
-    import re
-    
     # Remove excessive whitespace and newlines
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    
-    # Remove leading/trailing whitespace from each line
-    lines = [line.strip() for line in text.split('\n')]
-    
-    # Remove empty lines at start and end
-    while lines and not lines[0]:
-        lines.pop(0)
-    while lines and not lines[-1]:
-        lines.pop()
+    text = EXCESS_NEWLINES_RE.sub('\n\n', text)
     
-    # Join lines back
-    cleaned = '\n'.join(lines)
+    # Remove leading/trailing whitespace from each line (empty lines at the
+    # start and end are dropped by the final strip)
+    cleaned = '\n'.join([line.strip() for line in text.split('\n')])
     
     # Fix spacing around punctuation
-    cleaned = re.sub(r'\s+([,.!?;:])', r'\1', cleaned)
-    cleaned = re.sub(r'([,.!?;:])\s*([A-Z])', r'\1 \2', cleaned)
+    cleaned = SPACE_BEFORE_PUNCT_RE.sub(r'\1', cleaned)
+    cleaned = PUNCT_BEFORE_CAPITAL_RE.sub(r'\1 \2', cleaned)
     
     # Ensure proper spacing after periods
-    cleaned = re.sub(r'\.([A-Z])', r'. \1', cleaned)
+    cleaned = PERIOD_BEFORE_CAPITAL_RE.sub(r'. \1', cleaned)
     
     return cleaned.strip()
 
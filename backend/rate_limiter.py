@@ -1,38 +1,46 @@
 """Rate limiter to prevent hitting OpenRouter rate limits."""
+import logging
 import time
 from threading import Lock
 
-class RateLimiter:
-    """Simple rate limiter to space out API requests."""
-    
-    def __init__(self, min_delay_seconds: float = 2.0):
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token-bucket rate limiter that allows short bursts of requests."""
+
+    def __init__(self, rate: float = 1 / 5.0, capacity: float = 3):
         """
-        Initialize rate limiter.
-        
+        Initialize token bucket.
+
         Args:
-            min_delay_seconds: Minimum seconds between requests
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
         """
-        self.min_delay = min_delay_seconds
-        self.last_request_time = 0
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
         self.lock = Lock()
-    
-    def wait_if_needed(self):
-        """Wait if necessary to maintain rate limit."""
+
+    def acquire(self):
+        """Take one token, sleeping (outside the lock) until it is available."""
         with self.lock:
-            current_time = time.time()
-            time_since_last = current_time - self.last_request_time
-            
-            if time_since_last < self.min_delay:
-                wait_time = self.min_delay - time_since_last
-                print(f"[RATE_LIMITER] Waiting {wait_time:.1f}s to avoid rate limits...")
-                time.sleep(wait_time)
-            
-            self.last_request_time = time.time()
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+
+            # Reserve the token up front; a negative balance is a queue of
+            # callers that each know exactly how long they have to wait
+            self.tokens -= 1
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait_time > 0:
+            logger.info("Waiting %.1fs to avoid rate limits", wait_time)
+            time.sleep(wait_time)
 
 # Global rate limiter instance
-_rate_limiter = RateLimiter(min_delay_seconds=5.0)  # 5 seconds between requests (increased rate)
+_rate_limiter = TokenBucket(rate=1 / 5.0, capacity=3)  # 1 request per 5 seconds, bursts of 3
 
 def wait_for_rate_limit():
     """Wait if necessary to maintain rate limit."""
-    _rate_limiter.wait_if_needed()
-
+    _rate_limiter.acquire()
@@ -0,0 +1,140 @@
+"""Semantic response cache for RAG answers."""
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from backend.config import (
+    EMBEDDING_DIMENSIONS,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_THRESHOLD,
+    RESPONSE_CACHE_TTL,
+)
+
+
+def _normalize_question(question: str) -> str:
+    """Normalize a question for exact-match lookups."""
+    return " ".join(question.lower().split())
+
+
+class SemanticCache:
+    """
+    Cache of answers keyed by question embedding.
+
+    A question whose embedding has cosine similarity >= threshold with a cached
+    question gets the cached answer. Embeddings are unit-norm, so similarity is a
+    single matrix-vector product over a fixed-size ring buffer.
+    """
+
+    def __init__(self, size: int, threshold: float, ttl: float):
+        """
+        Initialize the cache.
+
+        Args:
+            size: Maximum number of cached answers (oldest are overwritten first)
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an answer stays valid
+        """
+        self.size = size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.embeddings = np.zeros((size, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        self.expires = np.zeros(size)
+        self.responses: List[Optional[str]] = [None] * size
+        self.questions: List[Optional[str]] = [None] * size
+        self.exact = {}  # normalized question -> slot
+        self.count = 0
+        self.next_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_exact(self, question: str) -> Optional[str]:
+        """Look up an identical question without needing an embedding."""
+        key = _normalize_question(question)
+        with self.lock:
+            slot = self.exact.get(key)
+            if slot is not None and self.expires[slot] > time.monotonic():
+                self.hits += 1
+                return self.responses[slot]
+        return None
+
+    def get(self, embedding: List[float]) -> Optional[str]:
+        """
+        Look up the answer to the most similar cached question.
+
+        Args:
+            embedding: Unit-norm question embedding
+
+        Returns:
+            Cached answer, or None on a miss
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        with self.lock:
+            if self.count:
+                scores = self.embeddings[:self.count] @ query
+                scores[self.expires[:self.count] <= time.monotonic()] = -1.0
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    return self.responses[best]
+            self.misses += 1
+        return None
+
+    def put(self, question: str, embedding: Optional[List[float]], response: str):
+        """
+        Store an answer.
+
+        Args:
+            question: Original question
+            embedding: Unit-norm question embedding (None stores an exact-match entry only)
+            response: Answer to cache
+        """
+        with self.lock:
+            slot = self.next_slot
+            old_question = self.questions[slot]
+            if old_question is not None and self.exact.get(old_question) == slot:
+                del self.exact[old_question]
+
+            key = _normalize_question(question)
+            if embedding is not None:
+                self.embeddings[slot] = embedding
+            else:
+                self.embeddings[slot] = 0.0  # Never matches semantically
+            self.expires[slot] = time.monotonic() + self.ttl
+            self.responses[slot] = response
+            self.questions[slot] = key
+            self.exact[key] = slot
+
+            self.next_slot = (slot + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+
+    def clear(self):
+        """Drop every cached answer (e.g. after the documents they were built from change)."""
+        with self.lock:
+            self.expires[:] = 0.0
+            self.responses = [None] * self.size
+            self.questions = [None] * self.size
+            self.exact.clear()
+            self.count = 0
+            self.next_slot = 0
+
+    def stats(self) -> dict:
+        """Get hit/miss counters."""
+        with self.lock:
+            return {
+                'enabled': RESPONSE_CACHE_ENABLED,
+                'entries': self.count,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Global cache instance
+response_cache = SemanticCache(
+    size=RESPONSE_CACHE_SIZE,
+    threshold=RESPONSE_CACHE_THRESHOLD,
+    ttl=RESPONSE_CACHE_TTL
+)
@@ -1,5 +1,6 @@
 """Start the backend API server."""
 
+import os
 import sys
 from pathlib import Path
 import argparse  # Import the argparse module for command-line argument parsing
@@ -9,25 +10,45 @@ import socket  # Import the socket module for port availability checking
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from werkzeug.debug import DebuggedApplication
+from werkzeug.serving import make_server
+
 from backend.api import app
 
 
-# --- Helper function: Check if a port is in use ---
-def is_port_in_use(host, port):
+# --- Helper function: Bind the server socket ---
+def bind_server_socket(host, port):
     """
-    Checks if the specified IP and port are currently in use.
-    Returns True if the port is occupied, False if available.
+    Binds and listens on the specified IP and port.
+    Returns the listening socket, or None if the port is in use.
+    The socket is handed to the server as-is, so the port is only bound once
+    (no window between checking the port and the server binding it).
     """
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        try:
-            # Try to bind the socket to the given host and port
-            s.bind((host, port))
-            return False  # Port is available
-        except socket.error:
-            return True  # Port is in use
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if os.name == 'nt':
+            # On Windows SO_REUSEADDR would let us bind a port another process is
+            # listening on; claim it exclusively so a busy port fails to bind
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            # Allow rebinding while an old connection is still in TIME_WAIT
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((host, port))
+        s.listen(128)
+        return s
+    except (socket.error, OverflowError):
+        s.close()
+        return None
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """
+    Parse command-line arguments, bind the port and run the server.
+    This is the single entry point for the backend: run `python backend/start.py`.
+
+    Args:
+        argv: Argument list to parse (defaults to sys.argv[1:])
+    """
     # --- 1. Set up command-line argument parser ---
     parser = argparse.ArgumentParser(
         description="ASFC Backend API Server. Listens on a specified IP and port."
@@ -46,9 +67,26 @@ if __name__ == "__main__":
         default=5000,
         help="The port number to listen on (default: 5000)",
     )
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument(
+        "--prod",
+        action="store_true",
+        help="Serve with the waitress production WSGI server",
+    )
+    mode_group.add_argument(
+        "--debug",
+        action="store_true",
+        help="Enable the interactive Werkzeug debugger (development only)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=8,
+        help="Worker threads for the production server (default: 8)",
+    )
 
     # --- 2. Parse command-line arguments ---
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Get the host and port specified by the user or default values
     listen_host = args.host
@@ -60,20 +98,22 @@ if __name__ == "__main__":
     # --- 3. Port availability checking logic ---
     # If the user did not explicitly specify a port (i.e., using the default 5000),
     # then try 5001 if 5000 is occupied.
+    server_socket = bind_server_socket(listen_host, listen_port)
     if original_port_specified == 5000:
-        if is_port_in_use(listen_host, listen_port):
+        if server_socket is None:
             print(f"[ERROR] Port {listen_port} is already in use on {listen_host}!")
             print(f"[INFO] Trying port {listen_port + 1} instead...")
             listen_port += 1
+            server_socket = bind_server_socket(listen_host, listen_port)
             # Check if the next port is also available
-            if is_port_in_use(listen_host, listen_port):
+            if server_socket is None:
                 print(f"[ERROR] Port {listen_port} is also in use on {listen_host}.")
                 print("Please specify an available port using the --port argument.")
                 sys.exit(1)
     # If the user explicitly specified a port, only check that specific port.
     # If it's in use, exit with an error.
     else:
-        if is_port_in_use(listen_host, listen_port):
+        if server_socket is None:
             print(f"[ERROR] Port {listen_port} is already in use on {listen_host}.")
             print("Please specify an available port using the --port argument.")
             sys.exit(1)
@@ -84,10 +124,37 @@ if __name__ == "__main__":
     print("=" * 60)
     print(f"Starting server on http://{listen_host}:{listen_port}")
     print(f"Frontend should connect to: http://{listen_host}:{listen_port}/api")
+    if args.prod:
+        print(f"Mode: production (waitress, {args.threads} threads)")
+    elif args.debug:
+        print("Mode: development (debugger enabled)")
+    else:
+        print("Mode: development")
     print("=" * 60)
 
     try:
-        app.run(debug=True, port=listen_port, host=listen_host)
+        # Serve on the already-bound socket instead of letting the server bind again
+        if args.prod:
+            from waitress import serve
+
+            serve(app, sockets=[server_socket], threads=args.threads, channel_timeout=60)
+        else:
+            application = app
+            if args.debug:
+                app.debug = True
+                application = DebuggedApplication(app, evalex=True)
+            server = make_server(
+                listen_host,
+                listen_port,
+                application,
+                threaded=True,
+                fd=server_socket.fileno(),
+            )
+            server.serve_forever()
     except OSError as e:
         print(f"[ERROR] Failed to start server: {e}")
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
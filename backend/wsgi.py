@@ -0,0 +1,7 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -k gthread -w 4 --threads 8 --timeout 300 backend.wsgi:app
+"""
+from backend.api import app
+
+__all__ = ["app"]
@@ -246,6 +246,55 @@ function formatMessageContent(text: string): string {
   }
 }
 
+// Stream the answer into a new assistant message. Returns false (without
+// adding a message) when the streaming endpoint isn't available.
+async function streamAnswer(question: string): Promise<boolean> {
+  const response = await fetch(`${API_URL}/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ question }),
+  });
+  
+  if (response.status === 404 || response.status === 405 || !response.body) {
+    return false;
+  }
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+  }
+  
+  const message: ChatMessage = { role: 'assistant', content: '' };
+  messages.push(message);
+  
+  // Re-render at most once per frame, however fast tokens arrive
+  let renderPending = false;
+  const scheduleRender = () => {
+    if (renderPending) return;
+    renderPending = true;
+    requestAnimationFrame(() => {
+      renderPending = false;
+      renderMessages();
+    });
+  };
+  
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      message.content += decoder.decode(value, { stream: true });
+      scheduleRender();
+    }
+    message.content += decoder.decode();
+  } finally {
+    renderMessages();
+    saveMessages().catch(err => console.error('Error saving messages:', err));
+  }
+  return true;
+}
+
 async function sendMessage() {
   const question = questionInput.value.trim();
   if (!question) return;
@@ -258,6 +307,14 @@ async function sendMessage() {
   statusDiv.className = 'status loading';
   
   try {
+    // Show the answer as it's generated; deployments without the streaming
+    // endpoint fall back to waiting for the whole response
+    if (await streamAnswer(question)) {
+      statusDiv.textContent = '';
+      statusDiv.className = '';
+      return;
+    }
+    
     const response = await fetch(`${API_URL}/chat`, {
       method: 'POST',
       headers: {
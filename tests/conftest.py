@@ -0,0 +1,6 @@
+"""Shared pytest setup."""
+import sys
+from pathlib import Path
+
+# Tests import the backend the same way the servers do, from the project root
+sys.path.insert(0, str(Path(__file__).parent.parent))
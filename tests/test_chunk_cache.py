@@ -0,0 +1,99 @@
+"""Tests for the retrieval cache in load_relevant_chunks."""
+import orjson
+import pytest
+
+import backend.rag as rag
+from backend.database.repository import ChunkRepository
+
+CHUNKS = [{"source": "Bulletin-1.pdf", "page": 1, "text": "Fuel filter water separators"}]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    rag.clear_chunk_cache()
+    yield
+    rag.clear_chunk_cache()
+
+
+@pytest.fixture
+def retrieval(monkeypatch):
+    """Replace the database / file retrieval with a stub that records its calls."""
+    calls = []
+    outcome = {"chunks": CHUNKS, "from_database": True}
+    
+    def fake_retrieve(query, top_k, query_embedding, bulletin_source):
+        calls.append(query)
+        return list(outcome["chunks"]), outcome["from_database"]
+    
+    monkeypatch.setattr(rag, "_retrieve_chunks", fake_retrieve)
+    return calls, outcome
+
+
+def test_database_results_are_cached_per_normalized_question(retrieval):
+    calls, _ = retrieval
+    
+    first = rag.load_relevant_chunks("What about  fuel filters?", top_k=3)
+    second = rag.load_relevant_chunks("what about fuel FILTERS?", top_k=3)
+    
+    assert first == second == CHUNKS
+    assert len(calls) == 1
+    
+    # Callers get their own list, so mutating it doesn't touch the cache
+    second.clear()
+    assert rag.load_relevant_chunks("what about fuel filters?", top_k=3) == CHUNKS
+
+
+def test_cache_is_keyed_on_top_k(retrieval):
+    calls, _ = retrieval
+    
+    rag.load_relevant_chunks("fuel filters", top_k=3)
+    rag.load_relevant_chunks("fuel filters", top_k=5)
+    
+    assert len(calls) == 2
+
+
+def test_empty_results_are_not_cached(retrieval):
+    calls, outcome = retrieval
+    outcome["chunks"] = []
+    
+    assert rag.load_relevant_chunks("unknown topic", top_k=3) == []
+    assert rag.load_relevant_chunks("unknown topic", top_k=3) == []
+    
+    assert len(calls) == 2
+
+
+def test_file_fallback_results_are_not_cached(retrieval):
+    calls, outcome = retrieval
+    outcome["from_database"] = False
+    
+    rag.load_relevant_chunks("fuel filters", top_k=3)
+    rag.load_relevant_chunks("fuel filters", top_k=3)
+    
+    assert len(calls) == 2
+
+
+def test_clear_and_expiry(retrieval, monkeypatch):
+    calls, _ = retrieval
+    
+    rag.load_relevant_chunks("fuel filters", top_k=3)
+    rag.clear_chunk_cache()
+    rag.load_relevant_chunks("fuel filters", top_k=3)
+    assert len(calls) == 2
+    
+    monkeypatch.setattr(rag, "CHUNK_CACHE_TTL", -1.0)
+    rag.load_relevant_chunks("water separators", top_k=3)
+    rag.load_relevant_chunks("water separators", top_k=3)
+    assert len(calls) == 4
+
+
+def test_database_error_falls_back_to_files_without_caching(tmp_path, monkeypatch):
+    def failing_search(*args, **kwargs):
+        raise ConnectionError("database unavailable")
+    
+    monkeypatch.setattr(ChunkRepository, "search_by_text", staticmethod(failing_search))
+    monkeypatch.setattr(rag, "CHUNK_DIR", tmp_path)
+    chunk_file = tmp_path / "Bulletin-1.jsonl"
+    chunk_file.write_bytes(b"".join(orjson.dumps(chunk) + b"\n" for chunk in CHUNKS))
+    
+    assert rag.load_relevant_chunks("water separators", top_k=3, query_embedding=[0.0]) == CHUNKS
+    assert not rag._chunk_cache
@@ -0,0 +1,71 @@
+"""Tests for streaming multipart upload parsing."""
+import hashlib
+import random
+
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from backend.api import app, stream_upload_to_file, UPLOAD_READ_SIZE, MAX_FORM_FIELD_SIZE
+
+BOUNDARY = "----asfc-test-boundary"
+
+
+def multipart_body(file_content, fields=None, filename="Bulletin-1.pdf"):
+    """Build a multipart/form-data body with the given form fields and "file" part."""
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+            + value + b'\r\n'
+        )
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        'Content-Type: application/pdf\r\n\r\n'.encode()
+        + file_content + b'\r\n'
+    )
+    parts.append(f'--{BOUNDARY}--\r\n'.encode())
+    return b''.join(parts)
+
+
+def parse_upload(body, dest_path):
+    """Run stream_upload_to_file on a request carrying body."""
+    with app.test_request_context(
+        '/api/upload',
+        method='POST',
+        data=body,
+        content_type=f'multipart/form-data; boundary={BOUNDARY}'
+    ):
+        return stream_upload_to_file(dest_path)
+
+
+def binary_content(size):
+    """Random bytes with plenty of CR/LF, which the decoder holds back as possible boundary starts."""
+    rng = random.Random(0)
+    return bytes(rng.choice(b'\r\n%PDF-1.7 binary\x00\xff') for _ in range(size))
+
+
+def test_binary_file_spanning_many_read_blocks(tmp_path):
+    content = binary_content(5 * UPLOAD_READ_SIZE + 123)
+    dest = tmp_path / "upload.pdf"
+    
+    filename, fields, file_size, digest = parse_upload(
+        multipart_body(content, {"replace_id": b"42"}), dest
+    )
+    
+    assert filename == "Bulletin-1.pdf"
+    assert fields == {"replace_id": "42"}
+    assert file_size == len(content)
+    assert digest == hashlib.sha256(content).hexdigest()
+    assert dest.read_bytes() == content
+
+
+def test_oversized_form_field_is_rejected(tmp_path):
+    body = multipart_body(b'%PDF-1.7', {"replace_filename": b'x' * (MAX_FORM_FIELD_SIZE + 1)})
+    
+    with pytest.raises(RequestEntityTooLarge):
+        parse_upload(body, tmp_path / "upload.pdf")
+
+
+def test_non_pdf_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Only PDF files"):
+        parse_upload(multipart_body(b'hello', filename="notes.txt"), tmp_path / "upload.pdf")